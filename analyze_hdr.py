@@ -1,10 +1,20 @@
 import pandas as pd
-import seaborn as sns
-import matplotlib.pyplot as plt
-from dotenv import load_dotenv
 import os
+import sys
 from pathlib import Path
 
+from hdr import datasets
+from hdr.config import annex_path, get_setting
+from hdr.fingerprints import fingerprint_file
+from hdr.jobs import report_progress
+from hdr.lazy import lazy_import
+from hdr.quality import quality_report
+from hdr.report import write_report
+
+# the plotting libraries are only imported once the first figure is drawn
+sns = lazy_import("seaborn")
+plt = lazy_import("matplotlib.pyplot")
+
 # a function for deleting every .txt file in the root directory and its sub-directories
 def delete_txt_file(directory):
     path = Path(directory)
@@ -13,18 +23,6 @@ def delete_txt_file(directory):
         print(f"Deleted: {txt_file}\n", "-"*30)
 
 
-# a function to cast to float and integer datatypes. use for desired columns.
-def cast_number(item):
-    try:
-        # First, try to cast to float
-        return float(item) if isinstance(float(item), float) else item
-    except (TypeError, ValueError):
-        try:
-            # If float conversion fails, try casting to int
-            return int(item)
-        except (TypeError, ValueError):
-            return item
-
 # function for detecting outliers using IQR method
 def detect_outliers_iqr(df, column):
     Q1 = df[column].quantile(0.25)
@@ -41,11 +39,8 @@ try:
     print("the dataset exists: ", os.path.exists("config.env"), "\n")
 except:
     print("the dataset file is either missing or empty\n")
-# load the config file from the config.env file
-load_dotenv("config.env")
-
-# root directory of the output
-root_dir = os.getenv("root_dir_output")
+# root directory of the output. read from the config.env file
+root_dir = get_setting("root_dir_output")
 
 # directory for saving the result text file of the HDI dataframe
 save_txt_hdi = os.path.join(root_dir, "txt/hdi")
@@ -64,32 +59,39 @@ os.makedirs(save_figures_hdi,exist_ok=True)
 print(f"save hdi figures at: {save_figures_hdi}")
 
 
-# check the path of the dataset
-print(f"path of the dataset:\n{os.getenv('data_path')}", "\n", "-"*30)
+# excel filepath: the first argument, or the default annex workbook
+filepath = sys.argv[1] if len(sys.argv) > 1 else annex_path()
 
-# excel filepath
-filepath = os.path.join(os.getenv("data_path"),
-                        "HDR23-24_Statistical_Annex_Tables_1-7.xlsx")
+# check the path of the dataset
+print(f"path of the dataset:\n{os.path.dirname(filepath)}", "\n", "-"*30)
 print(f"excel file path is:\n{filepath}\n")
 
 # let's load the dataset file
-df_HDI = pd.read_excel(filepath, sheet_name="HDI")
-
-# let's filter and remove the columns that their names contain "unnamed".
-df_HDI = df_HDI.loc[:, ~df_HDI.columns.str.contains("^Unnamed")]
-
-# let's rename the columns to have better namings
-df_HDI.rename(columns={"Human Development Index (HDI) ": "HDI",
-              "HDI rank.1": "HDI_rank"}, inplace=True)
-
-# cast the specified columns to the numeric values
-df_HDI[["HDI", "Expected years of schooling", "Mean years of schooling", "Gross national income (GNI) per capita", "GNI per capita rank minus HDI rank", "HDI_rank"]] = df_HDI[[
-    "HDI", "Expected years of schooling", "Mean years of schooling", "Gross national income (GNI) per capita", "GNI per capita rank minus HDI rank", "HDI_rank"]].apply(pd.to_numeric, errors="coerce")
-
-# drop the HDI rank column. it was redundant.
-df_HDI.drop("HDI rank", inplace=True, axis=1)
+report_progress(stage="load")
+sheets = pd.read_excel(filepath, sheet_name=None)
+df_HDI_raw = sheets["HDI"]
+
+# the derived frames come from the same dataset graph as the dashboard pages
+fingerprint = fingerprint_file(filepath)
+sources = datasets.annex_sources(fingerprint, sheets)
+
+# rename the columns, cast them to numeric values and drop the redundant
+# HDI rank column
+df_HDI = datasets.get("hdi_typed", sources)
+
+# count the cells that were coerced to numbers, per column: sentinels such
+# as ".." and text that is not a number become NaN, footnote letters are
+# split off
+coercion_report = datasets.get("hdi_coerced", sources).report
+print(f"Coercion of df_HDI:\n{coercion_report}\n", "-"*30)
+with open(df_hdi_txt, "a") as file:
+    file.write("Numeric coercion of the df_HDI columns:\n")
+    file.write(coercion_report.to_string())
+    file.write("\n"+"-"*30+"\n")
+    print(f"df_HDI coercion is written to the file {df_hdi_txt}\n", "-"*30)
 
 # describe the dataset to have an insight of it.
+report_progress(stage="describe")
 print(f"Describe df_HDI:\n{df_HDI.describe()}\n","-"*30)
 with open(df_hdi_txt,"a") as file:
     file.write("Describe the df_HDI dataframe:\n")
@@ -106,33 +108,36 @@ with open(df_hdi_txt,"a") as file:
     file.write("\n"+"-"*30+"\n")
     print(f"dtypes of df_HDI is written at {df_hdi_txt}.\n","-"*30)
 
-# check fr missing values
-print(f"check for number of null values: {df_HDI.isnull().sum()}\n", "-"*30)
+# check fr missing values. the data-quality profile of the workbook is
+# computed once and shared with the dashboard, so it is not rescanned here
+report_progress(stage="missing values")
+quality = quality_report(fingerprint, sheets)
+hdi_quality = quality.sheet("HDI")
+print(f"data quality of the workbook:\n{quality.summary()}\n", "-"*30)
 
-# write the number of null values to the output txt file.
+# write the profile to the output txt file.
 with open(df_hdi_txt, "a") as file:
-    file.write("number of null values of df_HDI:\n")
-    file.write(df_HDI.isnull().sum().to_string())
+    file.write("data quality of the workbook:\n")
+    file.write(quality.summary().to_string())
     file.write("\n"+"-"*30+"\n")
-    print(
-        f"number of null values of df_HDI is written at {df_hdi_txt}.\n", "-"*30)
-
-# check the rows with missing values
-missing_rows = df_HDI[df_HDI.isna().any(axis=1)]
-print(f"missing rows of df_HDI:\n{missing_rows}\n", "-"*30)
-
-# write the rows with missing values to the output file
-with open(df_hdi_txt, "a") as file:
-    file.write("rows with missing values:\n")
-    file.write(missing_rows.to_string())
+    file.write("null values and ranges of the HDI sheet:\n")
+    file.write(hdi_quality.columns.drop(columns="sheet").to_string())
     file.write("\n"+"-"*30+"\n")
-    print(
-        f"rows with missing values of df_HDI is written at {df_hdi_txt}.\n", "-"*30)
+    file.write("missing-value patterns of the HDI sheet:\n")
+    file.write(hdi_quality.patterns.drop(columns="sheet").to_string())
+    file.write("\n"+"-"*30+"\n")
+    if not quality.duplicates.empty:
+        file.write("countries on several rows:\n")
+        file.write(quality.duplicates.to_string())
+        file.write("\n"+"-"*30+"\n")
+    print(f"data quality of the workbook is written at {df_hdi_txt}.\n",
+          "-"*30)
 
 # get rid rows with missing values
-df_HDI_clean = df_HDI.dropna()
+df_HDI_clean = datasets.get("hdi_clean", sources)
 
 # detecting outliers
+report_progress(stage="outliers")
 # first, select only the numeric columns
 numeric_columns = df_HDI_clean.select_dtypes(include="float64").columns
 for column in numeric_columns:
@@ -161,47 +166,68 @@ with open(df_hdi_txt, "a") as file:
 
 
 # let's do dome EDA
-# plot the distirbution of columns
-for column in numeric_columns:
-    if column=="HDI_rank":
-        continue
-    plt.figure(figsize=(8,6))
-    sns.histplot(df_HDI_clean[column],kde=True)
-    plt.title(f"Distribution of {column}")
-    figures_save_file=os.path.join(save_figures_hdi,f"Disribution of {column}.jpg")
-    plt.savefig(figures_save_file,format="jpg")
-    plt.close()
-    print(f"Distribution figure of {column} column is saved at:{figures_save_file}"+"\n"+"-"*30,"\n")
+# report_mode=small_multiples in config.env draws all the columns into a
+# few shared figures, with the bins, KDE and quartiles computed once per
+# column. the default draws one figure per column and plot type.
+small_multiples = get_setting("report_mode", "") == "small_multiples"
+report_progress(stage="distributions")
+if small_multiples:
+    distribution_columns = [
+        column for column in numeric_columns if column != "HDI_rank"]
+    for figures_save_file in write_report(
+            df_HDI_clean, distribution_columns, save_figures_hdi,
+            pair_columns=list(numeric_columns)):
+        print(f"Report figure is saved at:{figures_save_file}"+"\n"+"-"*30,"\n")
+        report_progress(figure=figures_save_file)
+else:
+    # plot the distirbution of columns
+    for column in numeric_columns:
+        if column=="HDI_rank":
+            continue
+        plt.figure(figsize=(8,6))
+        sns.histplot(df_HDI_clean[column],kde=True)
+        plt.title(f"Distribution of {column}")
+        figures_save_file=os.path.join(save_figures_hdi,f"Disribution of {column}.jpg")
+        plt.savefig(figures_save_file,format="jpg")
+        plt.close()
+        print(f"Distribution figure of {column} column is saved at:{figures_save_file}"+"\n"+"-"*30,"\n")
+        report_progress(figure=figures_save_file)
+
+    # let's check for outliers using boxplots
+    for column in numeric_columns:
+        if column=="HDI_rank":
+            continue
+        plt.figure(figsize=(8,6))
+        sns.boxplot(x=df_HDI_clean[column])
+        plt.title(f"Boxplot of {column}")
+        figures_save_file=os.path.join(save_figures_hdi,f"Boxplot of {column}.jpg")
+        plt.savefig(figures_save_file,format="jpg")
+        plt.close()
+        print(f"Outliers of {column} column is saved at:{figures_save_file}"+"\n"+"-"*30,"\n")
+        report_progress(figure=figures_save_file)
 
-# let's check for outliers using boxplots
-for column in numeric_columns:
-    if column=="HDI_rank":
-        continue
-    plt.figure(figsize=(8,6))
-    sns.boxplot(x=df_HDI_clean[column])
-    plt.title(f"Boxplot of {column}")
-    figures_save_file=os.path.join(save_figures_hdi,f"Boxplot of {column}.jpg")
-    plt.savefig(figures_save_file,format="jpg")
-    plt.close()
-    print(f"Outliers of {column} column is saved at:{figures_save_file}"+"\n"+"-"*30,"\n")
-    
 
 # check the correlation between numeric variables
-correlation_matrix=df_HDI_clean[numeric_columns].corr()
+report_progress(stage="correlation")
+correlation_matrix=datasets.get("hdi_correlation", sources)
 sns.heatmap(correlation_matrix,annot=True,cmap="Pastel2_r",linewidths="0.5",linecolor="gray")
 figures_save_file=os.path.join(save_figures_hdi,f"Correlation matrix of df_HDI_clean.jpg")
 plt.savefig(figures_save_file,format="jpg")
 plt.close()
 print(f"Correlation matrix of df_HDI_clean is saved at:{figures_save_file}"+"\n"+"-"*30,"\n")
+report_progress(figure=figures_save_file)
 
-# pairplot
-sns.pairplot(df_HDI_clean[numeric_columns],corner=True)
-figures_save_file=os.path.join(save_figures_hdi,f"Pairplot of df_HDI_clean.jpg")
-plt.savefig(figures_save_file,format="jpg")
-plt.close()
-print(f"Pairplot of df_HDI_clean is saved at:{figures_save_file}"+"\n"+"-"*30,"\n")
+# pairplot. the small-multiples report has its own pair grid
+if not small_multiples:
+    sns.pairplot(df_HDI_clean[numeric_columns],corner=True)
+    figures_save_file=os.path.join(save_figures_hdi,f"Pairplot of df_HDI_clean.jpg")
+    plt.savefig(figures_save_file,format="jpg")
+    plt.close()
+    print(f"Pairplot of df_HDI_clean is saved at:{figures_save_file}"+"\n"+"-"*30,"\n")
+    report_progress(figure=figures_save_file)
 
 # plot the HDI of top 10 countries
+report_progress(stage="top countries")
 top_countries=df_HDI_clean[["Country","HDI"]].head(10)
 plt.figure(figsize=(12,10))
 sns.scatterplot(x="Country",y="HDI",data=top_countries)
@@ -211,4 +237,5 @@ figures_save_file=os.path.join(save_figures_hdi,f"Top 10 countries by HDI.jpg")
 plt.savefig(figures_save_file,format="jpg")
 plt.close()
 print(f"Top 10 countries by HDI is saved at:{figures_save_file}"+"\n"+"-"*30,"\n")
+report_progress(figure=figures_save_file)
 
@@ -1,10 +1,19 @@
 import streamlit as st
 
+from hdr.prewarm import start_prewarm
+from hdr.watcher import start_watcher
+
 st.set_page_config(
     page_title="Introduction to HDR",
     page_icon="🗺️"
 )
 
+# opt-in (prewarm=true in config.env): parse the default workbook in the
+# background while the user is still reading the introduction.
+start_prewarm()
+# opt-in (watch_data=true): re-ingest workbooks changed in data_path
+start_watcher()
+
 # title and subtitle of the page
 st.title("Human Development Report (HDR) Dashboard 📰")
 st.subheader("Exploring Global Development Indicators and Trends")
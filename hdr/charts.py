@@ -0,0 +1,158 @@
+"""Compact Plotly payloads for the dashboard charts.
+
+Plotly sends numeric NumPy arrays to the browser as base64 typed arrays, but
+always as float64. compact_figure narrows them first: integer-valued arrays
+become the smallest integer type plotly.js reads, and arrays that are only
+drawn or formatted through an axis become float32. Arrays whose raw values
+can appear in hover labels are only changed losslessly.
+"""
+
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass
+
+import numpy as np
+import streamlit as st
+
+from hdr.config import get_flag
+from hdr.lazy import lazy_import
+
+pio = lazy_import("plotly.io")
+
+logger = logging.getLogger(__name__)
+
+# drawn, or formatted through an axis in hover labels: float32 keeps about
+# 7 significant digits, more than any of the charts can show
+REDUCED_PRECISION = ("x", "y", "lat", "lon", "marker.size")
+# can appear unformatted in hover labels: lossless changes only
+LOSSLESS = ("z", "values", "customdata", "marker.color", "marker.colors")
+# the integer typed arrays of plotly.js, smallest first. it has no int64
+INTEGER_TYPES = tuple(
+    np.dtype(t)
+    for t in (np.uint8, np.int8, np.uint16, np.int16, np.uint32, np.int32)
+)
+# payload stats of the last charts of the process
+MAX_STATS = 100
+
+
+@dataclass
+class PayloadStats:
+    """Size and encode time of a chart payload, before and after."""
+
+    traces: str
+    raw_bytes: int
+    raw_ms: float
+    compact_bytes: int
+    compact_ms: float
+
+    def __str__(self) -> str:
+        return (
+            f"{self.traces}: {self.raw_bytes / 1024:.1f} KiB in "
+            f"{self.raw_ms:.1f} ms -> {self.compact_bytes / 1024:.1f} KiB "
+            f"in {self.compact_ms:.1f} ms"
+        )
+
+
+_stats: deque[PayloadStats] = deque(maxlen=MAX_STATS)
+
+
+def compact_array(values, reduce: bool = False) -> np.ndarray | None:
+    """The narrowest typed array with the same values, None to keep as is.
+
+    Args:
+        values: the property value of a trace
+        reduce (bool, optional): allow float64 -> float32. Defaults to False.
+
+    Returns:
+        np.ndarray | None: the narrowed array, None if the value is not a
+        numeric array or is already as narrow as it can be
+    """
+    if not isinstance(values, np.ndarray) or values.size == 0:
+        return None
+    if values.dtype.kind not in "fiu":
+        return None
+    integral = values.dtype.kind in "iu"
+    if not integral:
+        with np.errstate(invalid="ignore"):
+            integral = bool(np.all(values == np.rint(values)))
+    if integral:
+        low, high = values.min(), values.max()
+        for dtype in INTEGER_TYPES:
+            if dtype.itemsize >= values.dtype.itemsize:
+                break
+            info = np.iinfo(dtype)
+            if info.min <= low and high <= info.max:
+                return values.astype(dtype)
+    if reduce and values.dtype == np.float64:
+        return values.astype(np.float32)
+    return None
+
+
+def compact_figure(fig):
+    """Narrow the numeric arrays of every trace of a figure, in place.
+
+    Args:
+        fig (go.Figure): the figure
+
+    Returns:
+        go.Figure: the same figure
+    """
+    for trace in fig.data:
+        for path in REDUCED_PRECISION + LOSSLESS:
+            if path not in trace:
+                continue
+            values = compact_array(trace[path], path in REDUCED_PRECISION)
+            if values is not None:
+                trace[path] = values
+        # the axes of parallel coordinates
+        if "dimensions" in trace:
+            for dimension in trace.dimensions:
+                values = compact_array(dimension.values, reduce=True)
+                if values is not None:
+                    dimension.values = values
+    return fig
+
+
+def _encode(fig) -> tuple[int, float]:
+    start = time.perf_counter()
+    payload = pio.to_json(fig, validate=False)
+    return len(payload), (time.perf_counter() - start) * 1000
+
+
+def payload_stats() -> list[PayloadStats]:
+    """The payload stats recorded so far, oldest first."""
+    return list(_stats)
+
+
+def plotly_chart(fig, **kwargs):
+    """st.plotly_chart with a compact payload.
+
+    With `chart_stats=true` in config.env, the payload is encoded before and
+    after compaction, and the sizes and encode times are logged, kept in
+    payload_stats() and shown under the chart.
+
+    Args:
+        fig (go.Figure): the figure
+        **kwargs: passed to st.plotly_chart
+
+    Returns:
+        the st.plotly_chart element
+    """
+    if not get_flag("chart_stats"):
+        return st.plotly_chart(compact_figure(fig), **kwargs)
+    raw_bytes, raw_ms = _encode(fig)
+    compact_figure(fig)
+    compact_bytes, compact_ms = _encode(fig)
+    stats = PayloadStats(
+        traces=",".join(dict.fromkeys(trace.type for trace in fig.data)),
+        raw_bytes=raw_bytes,
+        raw_ms=raw_ms,
+        compact_bytes=compact_bytes,
+        compact_ms=compact_ms,
+    )
+    _stats.append(stats)
+    logger.info("chart payload %s", stats)
+    element = st.plotly_chart(fig, **kwargs)
+    st.caption(f"payload {stats}")
+    return element
@@ -0,0 +1,253 @@
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from hdr import datasets
+from hdr.datasets import Sources
+
+GNI_COLUMN = "Gross national income (GNI) per capita"
+FEATURES = (
+    "Life expectancy at birth",
+    "Expected years of schooling",
+    "Mean years of schooling",
+    GNI_COLUMN,
+)
+CLUSTER_COLUMN = "Cluster"
+K_RANGE = range(2, 11)
+
+
+@dataclass
+class ClusterResult:
+    """Fitted k-means clustering of the countries."""
+
+    k: int
+    features: tuple[str, ...]
+    labels: pd.Series
+    centroids: pd.DataFrame
+    silhouette: float
+    inertia: float
+
+    def assign(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Add the cluster of every row as a categorical column.
+
+        Rows that were not clustered (incomplete features) are missing.
+
+        Args:
+            df (pd.DataFrame): a frame with the index of the clustered frame
+
+        Returns:
+            pd.DataFrame: a copy of df with the CLUSTER_COLUMN column
+        """
+        labels = self.labels.reindex(df.index)
+        return df.assign(
+            **{
+                CLUSTER_COLUMN: pd.Categorical(
+                    labels.astype("Int64").astype("string"),
+                    categories=[str(i) for i in range(1, self.k + 1)],
+                )
+            }
+        )
+
+
+def _standardize(
+    df: pd.DataFrame, features: tuple[str, ...], log_gni: bool
+) -> pd.DataFrame:
+    """Z-score the features of the complete rows (log GNI if asked)."""
+    data = df[list(features)].apply(pd.to_numeric, errors="coerce")
+    if log_gni and GNI_COLUMN in data:
+        gni = data[GNI_COLUMN]
+        data[GNI_COLUMN] = np.log(gni.where(gni > 0))
+    data = data.dropna()
+    return (data - data.mean()) / data.std(ddof=0).replace(0, 1)
+
+
+def _model(k: int, mini_batch: bool, seed: int):
+    from sklearn.cluster import KMeans, MiniBatchKMeans
+
+    if mini_batch:
+        return MiniBatchKMeans(n_clusters=k, random_state=seed, n_init=3)
+    return KMeans(n_clusters=k, random_state=seed, n_init=10)
+
+
+def cluster_countries(
+    df: pd.DataFrame,
+    k: int,
+    features: tuple[str, ...] = FEATURES,
+    mini_batch: bool = False,
+    log_gni: bool = True,
+    seed: int = 0,
+) -> ClusterResult:
+    """Group countries by their standardized development indicators.
+
+    Cluster numbers are ordered by the centroids, so cluster 1 is always
+    the most developed profile (highest mean z-score).
+
+    Args:
+        df (pd.DataFrame): the cleaned annex dataframe
+        k (int): number of clusters
+        features (tuple[str, ...], optional): indicator columns.
+        mini_batch (bool, optional): use mini-batch k-means.
+        log_gni (bool, optional): cluster on log GNI per capita.
+        seed (int, optional): random seed of the initialisation.
+
+    Returns:
+        ClusterResult: labels, centroids (in original units) and scores
+    """
+    from sklearn.metrics import silhouette_score
+
+    data = _standardize(df, features, log_gni)
+    if len(data) <= k:
+        raise ValueError(f"not enough complete rows ({len(data)}) for {k}")
+    model = _model(k, mini_batch, seed).fit(data.to_numpy())
+
+    # relabel: 1 = the centroid with the highest mean z-score
+    order = np.argsort(-model.cluster_centers_.mean(axis=1))
+    relabel = np.empty(k, dtype=int)
+    relabel[order] = np.arange(1, k + 1)
+    labels = pd.Series(relabel[model.labels_], index=data.index)
+
+    raw = df.loc[data.index, list(features)].apply(
+        pd.to_numeric, errors="coerce"
+    )
+    centroids = raw.groupby(labels.to_numpy()).mean()
+    centroids.index.name = CLUSTER_COLUMN
+    return ClusterResult(
+        k=k,
+        features=tuple(features),
+        labels=labels,
+        centroids=centroids,
+        silhouette=float(silhouette_score(data, model.labels_)),
+        inertia=float(model.inertia_),
+    )
+
+
+@datasets.graph.node(
+    "hdi_clean", params=("k", "features", "mini_batch", "log_gni")
+)
+def clusters(
+    df: pd.DataFrame,
+    k: int,
+    features: tuple[str, ...] = FEATURES,
+    mini_batch: bool = False,
+    log_gni: bool = True,
+) -> ClusterResult:
+    """The k-means clustering of the cleaned HDI table."""
+    return cluster_countries(df, k, features, mini_batch, log_gni)
+
+
+def cached_clusters(
+    sources: Sources,
+    k: int,
+    features: tuple[str, ...] = FEATURES,
+    mini_batch: bool = False,
+    log_gni: bool = True,
+    sheet: str = "HDI",
+) -> ClusterResult:
+    """cluster_countries, computed once per (dataset, k, features, options).
+
+    Args:
+        sources (Sources): the annex sources
+        k (int): number of clusters
+        features (tuple[str, ...], optional): indicator columns.
+        mini_batch (bool, optional): use mini-batch k-means.
+        log_gni (bool, optional): cluster on log GNI per capita.
+        sheet (str, optional): the sheet read as the HDI table.
+
+    Returns:
+        ClusterResult: labels, centroids (in original units) and scores
+    """
+    return datasets.get(
+        "clusters",
+        sources,
+        k=k,
+        features=tuple(features),
+        mini_batch=mini_batch,
+        log_gni=log_gni,
+        sheet=sheet,
+    )
+
+
+def silhouette_scores(
+    sources: Sources,
+    features: tuple[str, ...] = FEATURES,
+    mini_batch: bool = False,
+    log_gni: bool = True,
+    k_range: range = K_RANGE,
+    sheet: str = "HDI",
+) -> pd.DataFrame:
+    """Silhouette score and inertia for every k, to help choose k.
+
+    Args:
+        sources (Sources): the annex sources
+        features (tuple[str, ...], optional): indicator columns.
+        mini_batch (bool, optional): use mini-batch k-means.
+        log_gni (bool, optional): cluster on log GNI per capita.
+        k_range (range, optional): the k values to try.
+        sheet (str, optional): the sheet read as the HDI table.
+
+    Returns:
+        pd.DataFrame: silhouette and inertia indexed by k
+    """
+    rows = {}
+    for k in k_range:
+        result = cached_clusters(
+            sources, k, features, mini_batch, log_gni, sheet
+        )
+        rows[k] = {"silhouette": result.silhouette, "inertia": result.inertia}
+    return pd.DataFrame.from_dict(rows, orient="index").rename_axis("k")
+
+
+def cluster_controls(
+    sources: Sources, key: str, sheet: str = "HDI"
+) -> ClusterResult | None:
+    """Render the clustering options and return the fitted clustering.
+
+    Args:
+        sources (Sources): the annex sources
+        key (str): prefix of the widget keys, unique per page
+        sheet (str, optional): the sheet read as the HDI table.
+
+    Returns:
+        ClusterResult | None: the clustering, None if no feature is selected
+    """
+    df = datasets.get("hdi_clean", sources, sheet=sheet)
+    with st.expander("Development clusters"):
+        available = [col for col in FEATURES if col in df.columns]
+        features = tuple(
+            st.multiselect(
+                "Indicators to cluster on:",
+                options=available,
+                default=available,
+                key=f"{key}_cluster_features",
+            )
+        )
+        k = st.slider(
+            "Number of clusters:",
+            min_value=K_RANGE.start,
+            max_value=K_RANGE.stop - 1,
+            value=4,
+            key=f"{key}_cluster_k",
+        )
+        mini_batch = st.checkbox(
+            "Use mini-batch k-means", key=f"{key}_cluster_mini_batch"
+        )
+        if not features:
+            st.warning("Please select at least one indicator.")
+            return None
+        try:
+            result = cached_clusters(
+                sources, k, features, mini_batch, sheet=sheet
+            )
+        except ValueError as error:
+            st.warning(str(error))
+            return None
+        st.write(f"Silhouette score: {result.silhouette:.3f}")
+        if st.checkbox("Show silhouette scores by k", key=f"{key}_sil"):
+            scores = silhouette_scores(
+                sources, features, mini_batch, sheet=sheet
+            )
+            st.line_chart(scores["silhouette"])
+        st.dataframe(result.centroids)
+    return result
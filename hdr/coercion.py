@@ -0,0 +1,125 @@
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+# cells that mean "no data" in the UNDP tables, compared in lower case
+SENTINELS = frozenset({"..", "...", "…", "—", "–", "-", "n.a.", "na", ""})
+# footnote letters of a cell (e.g. "a" or "a,b")
+FLAG_PATTERN = r"[a-z](?:\s*,\s*[a-z])*"
+# a number, optionally with thousands separators in groups of three,
+# followed by optional footnote letters (e.g. "1,234.5 c" or "0.71a,b").
+# any other comma (e.g. the decimal comma of "0,5") makes the cell invalid
+NUMBER_PATTERN = (
+    r"^(?P<number>[-+]?(?:\d{1,3}(?:,\d{3})*(?:\.\d+)?|\d*\.?\d+)"
+    r"(?:[eE][-+]?\d+)?)"
+    rf"\s*(?P<flag>{FLAG_PATTERN})?$"
+)
+COUNTS = (
+    "numbers",
+    "parsed",
+    "footnoted",
+    "thousands",
+    "sentinels",
+    "invalid",
+    "missing",
+)
+
+
+@dataclass
+class CoercedFrame:
+    """A frame with numeric columns, and what it took to get there."""
+
+    frame: pd.DataFrame
+    flags: pd.DataFrame
+    report: pd.DataFrame
+
+
+def coerce_numeric(
+    df: pd.DataFrame, columns: list | pd.Index | None = None
+) -> CoercedFrame:
+    """Convert a block of columns to numbers in one vectorized pass.
+
+    Plain numbers go through pd.to_numeric; only the cells it rejects are
+    parsed as text: UNDP sentinels ("..", "—", ...) become NaN, thousands
+    separators are dropped and footnote letters ("0.71 a") are split off
+    into the flags frame.
+
+    Args:
+        df (pd.DataFrame): the input frame; it is not modified
+        columns (list | pd.Index | None, optional): the columns to coerce.
+            all if None.
+
+    Returns:
+        CoercedFrame: the frame with float columns, the footnote flags of
+        the columns that have any (categorical) and the number of cells of
+        every kind per coerced column (see COUNTS)
+    """
+    columns = list(df.columns if columns is None else columns)
+    report = pd.DataFrame(0, index=columns, columns=list(COUNTS))
+    report.index.name = "column"
+    values, flags = {}, {}
+
+    numeric = [c for c in columns if pd.api.types.is_numeric_dtype(df[c])]
+    for col in numeric:
+        values[col] = df[col].astype(float)
+        report.loc[col, "numbers"] = df[col].notna().sum()
+        report.loc[col, "missing"] = df[col].isna().sum()
+
+    text_columns = [c for c in columns if c not in numeric]
+    if text_columns:
+        n_rows = len(df)
+        # every cell of the block in one series, column after column
+        cells = pd.Series(
+            df[text_columns].to_numpy(dtype=object).ravel(order="F")
+        )
+        column_of = np.repeat(np.arange(len(text_columns)), n_rows)
+        result = pd.to_numeric(cells, errors="coerce").astype(float)
+        rest = cells.notna() & result.isna()
+
+        text = cells[rest].astype(str).str.strip().str.replace("−", "-")
+        sentinel = text.str.lower().isin(SENTINELS)
+        parts = text[~sentinel].str.extract(NUMBER_PATTERN)
+        number = parts["number"]
+        parsed = pd.to_numeric(
+            number.str.replace(",", "", regex=False), errors="coerce"
+        )
+        result[parsed.index] = parsed
+
+        masks = {
+            "numbers": (cells.notna() & ~rest).to_numpy(),
+            "missing": cells.isna().to_numpy(),
+        }
+        for name, mask in (
+            ("parsed", parsed.notna()),
+            ("footnoted", parts["flag"].notna()),
+            ("thousands", number.str.contains(",", na=False)),
+            ("sentinels", sentinel),
+            ("invalid", parsed.isna()),
+        ):
+            masks[name] = np.zeros(len(cells), dtype=bool)
+            masks[name][mask[mask].index] = True
+        for name, mask in masks.items():
+            report.loc[text_columns, name] = np.bincount(
+                column_of[mask], minlength=len(text_columns)
+            )
+
+        block = result.to_numpy().reshape(len(text_columns), n_rows)
+        flag = pd.Series(np.nan, index=cells.index, dtype=object)
+        flag[parts.index] = parts["flag"].str.replace(r"\s", "", regex=True)
+        flag_block = flag.to_numpy().reshape(len(text_columns), n_rows)
+        for i, col in enumerate(text_columns):
+            values[col] = pd.Series(block[i], index=df.index)
+            if report.loc[col, "footnoted"]:
+                flags[col] = pd.Series(
+                    flag_block[i], index=df.index, dtype="category"
+                )
+
+    frame = df.copy()
+    for col in columns:
+        frame[col] = values[col]
+    return CoercedFrame(
+        frame=frame,
+        flags=pd.DataFrame(flags, index=df.index),
+        report=report,
+    )
@@ -0,0 +1,49 @@
+import os
+from functools import lru_cache
+
+CONFIG_FILE = "config.env"
+ANNEX_WORKBOOK = "HDR23-24_Statistical_Annex_Tables_1-7.xlsx"
+POP_GNIPC_WORKBOOK = "pop_gnipc.xlsx"
+
+
+@lru_cache(maxsize=None)
+def _load_config() -> None:
+    """Load config.env into the environment, once per process."""
+    from dotenv import load_dotenv
+
+    load_dotenv(CONFIG_FILE)
+
+
+def get_setting(name: str, default: str | None = None) -> str | None:
+    """Read a setting from the environment or the config.env file.
+
+    Args:
+        name (str): name of the setting
+        default (str | None, optional): value if the setting is missing.
+
+    Returns:
+        str | None: the value of the setting
+    """
+    _load_config()
+    return os.getenv(name, default)
+
+
+def get_flag(name: str) -> bool:
+    """Read a boolean setting. "1", "true", "yes" and "on" are true."""
+    value = get_setting(name, "") or ""
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def data_path() -> str:
+    """Directory of the input workbooks (`data_path` in config.env)."""
+    return get_setting("data_path", "") or ""
+
+
+def annex_path() -> str:
+    """Path of the default HDR statistical annex workbook."""
+    return os.path.join(data_path(), ANNEX_WORKBOOK)
+
+
+def pop_gnipc_path() -> str:
+    """Path of the population and GNI per capita workbook."""
+    return os.path.join(data_path(), POP_GNIPC_WORKBOOK)
@@ -0,0 +1,345 @@
+import hashlib
+import inspect
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable
+
+import pandas as pd
+
+from hdr.coercion import CoercedFrame, coerce_numeric
+from hdr.fingerprints import frame_fingerprint
+from hdr.schema import HDI_SCHEMA, TRENDS_SCHEMA, compile_mapping
+from hdr.trends import TrendPanel, build_panel
+
+# sources: name -> (fingerprint, value). the fingerprint identifies the
+# content, e.g. the hash of the workbook a sheet comes from
+Sources = dict[str, tuple[str, Any]]
+# workbooks whose sheet fingerprints are kept
+MAX_SHEET_FINGERPRINTS = 8
+
+
+@dataclass(frozen=True)
+class Node:
+    """A derived dataset: a function of other datasets and parameters."""
+
+    name: str
+    func: Callable
+    inputs: tuple[str, ...]
+    params: tuple[str, ...]
+    defaults: dict[str, Any]
+
+
+class DatasetGraph:
+    """Lazily computed derived datasets, memoized by input fingerprints.
+
+    Every node declares its inputs (sources or other nodes) and parameters.
+    The memo key of a node hashes its name, the keys of its inputs and its
+    parameter values, so a changed source or parameter invalidates exactly
+    the nodes downstream of it; everything else is served from the memo.
+    The memo is shared by all sessions of the process: the values are
+    shared objects and must not be modified. Sessions that ask for the same
+    dataset at once wait for one computation instead of repeating it.
+
+    Input names may use the node's parameters as format fields, e.g.
+    "sheet:{sheet}", so a node can depend on one sheet chosen by a
+    parameter.
+    """
+
+    def __init__(self, max_entries: int = 128):
+        self.max_entries = max_entries
+        self._nodes: dict[str, Node] = {}
+        self._memo: OrderedDict[str, Any] = OrderedDict()
+        self._lock = threading.Lock()
+        # memo key -> lock held while the dataset is computed
+        self._computing: dict[str, threading.Lock] = {}
+
+    def node(self, *inputs: str, params: tuple[str, ...] = ()):
+        """Register the decorated function as the node of its name.
+
+        Args:
+            *inputs (str): names of the sources or nodes passed positionally.
+                "{param}" fields are filled with the parameter values.
+            params (tuple[str, ...], optional): keyword parameters of the
+                function. missing parameters take the function's default.
+        """
+
+        def register(func: Callable) -> Callable:
+            signature = inspect.signature(func).parameters
+            self._nodes[func.__name__] = Node(
+                name=func.__name__,
+                func=func,
+                inputs=inputs,
+                params=params,
+                defaults={
+                    name: signature[name].default
+                    for name in params
+                    if signature[name].default is not inspect.Parameter.empty
+                },
+            )
+            return func
+
+        return register
+
+    @staticmethod
+    def _inputs(node: Node, params: dict[str, Any]) -> list[str]:
+        values = {**node.defaults, **params}
+        return [name.format(**values) for name in node.inputs]
+
+    def key(self, name: str, sources: Sources, **params) -> str:
+        """Memo key of a dataset for the given sources and parameters."""
+        if name not in self._nodes:
+            return sources[name][0]
+        node = self._nodes[name]
+        values = {**node.defaults, **params}
+        parts = [name]
+        parts += [
+            self.key(i, sources, **params) for i in self._inputs(node, params)
+        ]
+        parts += [f"{p}={values.get(p)!r}" for p in node.params]
+        return hashlib.blake2b(
+            "|".join(parts).encode(), digest_size=16
+        ).hexdigest()
+
+    def get(self, name: str, sources: Sources, **params) -> Any:
+        """Compute a dataset, or return it from the memo if still valid.
+
+        Args:
+            name (str): the node or source
+            sources (Sources): fingerprint and value of every source
+            **params: parameter values. each node takes the ones it declares.
+
+        Returns:
+            Any: the dataset
+        """
+        if name not in self._nodes:
+            return sources[name][1]
+        key = self.key(name, sources, **params)
+        with self._lock:
+            if key in self._memo:
+                self._memo.move_to_end(key)
+                return self._memo[key]
+            computing = self._computing.setdefault(key, threading.Lock())
+        with computing:
+            # another session may have computed it while we waited
+            with self._lock:
+                if key in self._memo:
+                    self._memo.move_to_end(key)
+                    return self._memo[key]
+            try:
+                node = self._nodes[name]
+                args = [
+                    self.get(i, sources, **params)
+                    for i in self._inputs(node, params)
+                ]
+                kwargs = {p: params[p] for p in node.params if p in params}
+                value = node.func(*args, **kwargs)
+                with self._lock:
+                    self._memo[key] = value
+                    while len(self._memo) > self.max_entries:
+                        self._memo.popitem(last=False)
+            finally:
+                with self._lock:
+                    self._computing.pop(key, None)
+        return value
+
+
+graph = DatasetGraph()
+
+
+_sheet_fingerprints: OrderedDict[str, dict[str, str]] = OrderedDict()
+_sheet_lock = threading.Lock()
+
+
+def sheet_fingerprints(
+    fingerprint: str, sheets: dict[str, pd.DataFrame]
+) -> dict[str, str]:
+    """Content hash of every sheet of a workbook, computed once per workbook.
+
+    Args:
+        fingerprint (str): the fingerprint of the workbook
+        sheets (dict[str, pd.DataFrame]): its sheets
+
+    Returns:
+        dict[str, str]: sheet name -> frame_fingerprint of the sheet
+    """
+    with _sheet_lock:
+        if fingerprint in _sheet_fingerprints:
+            _sheet_fingerprints.move_to_end(fingerprint)
+            return _sheet_fingerprints[fingerprint]
+    hashes = {name: frame_fingerprint(df) for name, df in sheets.items()}
+    with _sheet_lock:
+        _sheet_fingerprints[fingerprint] = hashes
+        while len(_sheet_fingerprints) > MAX_SHEET_FINGERPRINTS:
+            _sheet_fingerprints.popitem(last=False)
+    return hashes
+
+
+def annex_sources(
+    fingerprint: str, sheets: dict[str, pd.DataFrame]
+) -> Sources:
+    """The sources of an annex workbook: the workbook and each sheet.
+
+    The "annex" source is keyed by the workbook, every "sheet:<name>" source
+    by the content of the sheet, so nodes that read one sheet survive a new
+    workbook version in which that sheet did not change.
+
+    Args:
+        fingerprint (str): the fingerprint of the workbook
+        sheets (dict[str, pd.DataFrame]): its sheets
+
+    Returns:
+        Sources: the "annex" and "sheet:<name>" sources
+    """
+    hashes = sheet_fingerprints(fingerprint, sheets)
+    return {
+        "annex": (fingerprint, sheets),
+        **{f"sheet:{name}": (hashes[name], df) for name, df in sheets.items()},
+    }
+
+
+@graph.node("sheet:{sheet}", params=("sheet",))
+def hdi_raw(df: pd.DataFrame, sheet: str = "HDI") -> pd.DataFrame:
+    """The raw sheet of the annex workbook."""
+    return df
+
+
+@graph.node("hdi_raw")
+def hdi_coerced(df: pd.DataFrame) -> CoercedFrame:
+    """The HDI table with clear column names and numeric columns.
+
+    Args:
+        df (pd.DataFrame): the raw HDI sheet
+
+    Returns:
+        CoercedFrame: the table, its footnote flags and the coercion counts
+
+    Raises:
+        SchemaDriftError: if the header does not match HDI_SCHEMA
+    """
+    # select and rename the columns by the mapping of the sheet's header
+    # layout. a changed layout raises a SchemaDriftError here, before the
+    # table is processed
+    mapping = compile_mapping(HDI_SCHEMA, df.columns)
+    # cast the numeric columns of the mapping to numbers
+    return coerce_numeric(mapping.apply(df), mapping.numeric)
+
+
+@graph.node("hdi_coerced")
+def hdi_typed(coerced: CoercedFrame) -> pd.DataFrame:
+    """The typed HDI table, rows with missing values included."""
+    # drop the HDI rank column. it was redundant.
+    return coerced.frame.drop(columns="HDI rank", errors="ignore")
+
+
+@graph.node("hdi_typed")
+def hdi_clean(df: pd.DataFrame) -> pd.DataFrame:
+    """The HDI table without the rows with missing values."""
+    return df.dropna()
+
+
+@graph.node("hdi_clean")
+def hdi_numeric_columns(df: pd.DataFrame) -> pd.Index:
+    """The float indicator columns of the HDI table, HDI_rank excluded."""
+    return df.select_dtypes(include="float64").columns[:-1]
+
+
+@graph.node("hdi_clean")
+def hdi_correlation(df: pd.DataFrame) -> pd.DataFrame:
+    """Pairwise correlation of the numeric columns of the HDI table."""
+    return df.select_dtypes(include="number").corr()
+
+
+@graph.node("hdi_clean", params=("by",))
+def hdi_grouped(df: pd.DataFrame, by: str) -> pd.DataFrame:
+    """HDI and life expectancy statistics grouped by a column."""
+    return df.groupby(by).agg(
+        {
+            "HDI": ["mean", "median", "min", "max"],
+            "Life expectancy at birth": ["mean", "median", "min", "max"],
+        }
+    )
+
+
+@graph.node("pop_gnipc")
+def population(df: pd.DataFrame) -> pd.DataFrame:
+    """The population and GNI sheet, with the population in people."""
+    # the workbook counts the population in millions. round to whole people
+    # so the charts can send it as integers
+    return df.assign(Population=(df["Population"] * 1_000_000).round())
+
+
+@graph.node("hdi_clean", "population")
+def hdi_merged(df_1: pd.DataFrame, df_2: pd.DataFrame) -> pd.DataFrame:
+    """The HDI table merged with the population by country."""
+    return merge_dataframes(df_1, df_2)
+
+
+@graph.node("sheet:HDI trends")
+def trends_coerced(df: pd.DataFrame) -> CoercedFrame:
+    """The HDI trends table with standard names and numeric columns.
+
+    Args:
+        df (pd.DataFrame): the raw HDI trends sheet
+
+    Returns:
+        CoercedFrame: the table, its footnote flags and the coercion counts
+
+    Raises:
+        SchemaDriftError: if the header does not match TRENDS_SCHEMA
+    """
+    # the mapping drops the spacer and footnote columns, renames the years
+    # to hdi_YYYY and knows which columns are numeric
+    mapping = compile_mapping(TRENDS_SCHEMA, df.columns)
+    return coerce_numeric(mapping.apply(df), mapping.numeric)
+
+
+@graph.node("trends_coerced")
+def trends_clean(coerced: CoercedFrame) -> pd.DataFrame:
+    """The HDI trends table with one hdi_YYYY column per year."""
+    return coerced.frame
+
+
+@graph.node("trends_clean")
+def trends_long(df: pd.DataFrame) -> pd.DataFrame:
+    """The HDI trends in long format: country, year and hdi."""
+    long_df = pd.melt(
+        df,
+        id_vars=["country"],
+        value_vars=[col for col in df.columns if col.startswith("hdi_")],
+        var_name="year",
+        value_name="hdi",
+    )
+    long_df["year"] = long_df["year"].str.extract(r"(\d{4})").astype(int)
+    return long_df
+
+
+@graph.node("trends_clean")
+def trends_panel(df: pd.DataFrame) -> TrendPanel:
+    """The annual HDI panel of the trends table."""
+    return build_panel(df)
+
+
+def merge_dataframes(
+    df_1: pd.DataFrame,
+    df_2: pd.DataFrame,
+    on: str = "Country",
+    how: str = "left",
+) -> pd.DataFrame:
+    """Merge two dataframes on a specified column.
+
+    Args:
+        df_1 (pd.DataFrame): the first dataframe
+        df_2 (pd.DataFrame): the second dataframe
+        on (str, optional): the key column. Defaults to "Country".
+        how (str, optional): type of the merge. Defaults to "left".
+
+    Returns:
+        pd.DataFrame: the output dataframe that is merged.
+    """
+    return df_1.merge(df_2, on=on, how=how).reset_index(drop=True)
+
+
+def get(name: str, sources: Sources, **params) -> Any:
+    """Compute a dataset of the shared graph; see DatasetGraph.get."""
+    return graph.get(name, sources, **params)
@@ -0,0 +1,132 @@
+import io
+from functools import partial
+from typing import BinaryIO
+
+import pandas as pd
+import streamlit as st
+
+from hdr.fingerprints import frame_fingerprint
+
+# export format -> (file extension, mime type)
+EXPORT_FORMATS = {
+    "CSV": ("csv", "text/csv"),
+    "Parquet": ("parquet", "application/vnd.apache.parquet"),
+    "Arrow IPC": ("arrow", "application/vnd.apache.arrow.file"),
+    "XLSX": (
+        "xlsx",
+        "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    ),
+}
+
+
+def _prepare_frame(df: pd.DataFrame | pd.Series) -> pd.DataFrame:
+    """Turn the input into a flat frame that every export format accepts.
+
+    Args:
+        df (pd.DataFrame | pd.Series): the data to be exported
+
+    Returns:
+        pd.DataFrame: a frame with a default index and string column names
+    """
+    if isinstance(df, pd.Series):
+        df = df.to_frame()
+    # keep meaningful row labels (e.g. describe() or corr() output)
+    if not isinstance(df.index, pd.RangeIndex):
+        df = df.reset_index()
+    # flatten the multi-level columns of groupby aggregations
+    if isinstance(df.columns, pd.MultiIndex):
+        df = df.set_axis(
+            [" ".join(map(str, col)).strip() for col in df.columns], axis=1
+        )
+    return df.rename(columns=str)
+
+
+def _arrow_compatible(df: pd.DataFrame) -> pd.DataFrame:
+    """Store object columns that mix types as text, as Arrow requires.
+
+    e.g. the describe(include="all") frame mixes counts and strings.
+    """
+    import pyarrow as pa
+
+    mixed = {}
+    for col in df.select_dtypes(include="object").columns:
+        try:
+            pa.array(df[col], from_pandas=True)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            mixed[col] = df[col].where(df[col].isna(), df[col].astype(str))
+    return df.assign(**mixed) if mixed else df
+
+
+def write_export(df: pd.DataFrame, fmt: str, sink: BinaryIO) -> None:
+    """Serialize a dataframe into a binary sink.
+
+    Args:
+        df (pd.DataFrame): the prepared dataframe
+        fmt (str): one of the keys of EXPORT_FORMATS
+        sink (BinaryIO): a writable binary file-like object
+    """
+    if fmt == "CSV":
+        df.to_csv(sink, index=False, encoding="utf-8")
+    elif fmt in ("Parquet", "Arrow IPC"):
+        import pyarrow as pa
+
+        table = pa.Table.from_pandas(
+            _arrow_compatible(df), preserve_index=False
+        )
+        if fmt == "Parquet":
+            import pyarrow.parquet as pq
+
+            pq.write_table(table, sink)
+        else:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+    elif fmt == "XLSX":
+        df.to_excel(sink, index=False)
+    else:
+        raise ValueError(f"unsupported export format: {fmt}")
+
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def _export_bytes(fingerprint: str, fmt: str, _df: pd.DataFrame) -> bytes:
+    """Serialize a dataframe. cached per (fingerprint, format)."""
+    buffer = io.BytesIO()
+    write_export(_df, fmt, buffer)
+    return buffer.getvalue()
+
+
+def export_payload(df: pd.DataFrame | pd.Series, fmt: str) -> bytes:
+    """Build (or fetch from cache) the export payload of a dataframe.
+
+    Args:
+        df (pd.DataFrame | pd.Series): the data to be exported
+        fmt (str): one of the keys of EXPORT_FORMATS
+
+    Returns:
+        bytes: the payload
+    """
+    df = _prepare_frame(df)
+    return _export_bytes(frame_fingerprint(df), fmt, df)
+
+
+def download_data(df: pd.DataFrame | pd.Series, file_name: str) -> None:
+    """Render a format picker and a download button for a dataframe.
+
+    The payload is only built when the button is clicked.
+
+    Args:
+        df (pd.DataFrame | pd.Series): the data to be downloaded
+        file_name (str): name of the downloaded file, without extension
+    """
+    fmt = st.selectbox(
+        "Export format:", options=list(EXPORT_FORMATS), key=f"{file_name}_fmt"
+    )
+    extension, mime = EXPORT_FORMATS[fmt]
+    st.download_button(
+        label=f"Download data as {fmt}",
+        data=partial(export_payload, df, fmt),
+        file_name=f"{file_name}.{extension}",
+        mime=mime,
+        key=f"{file_name}_download",
+        # downloading must not rerun the whole page
+        on_click="ignore",
+    )
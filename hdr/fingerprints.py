@@ -0,0 +1,49 @@
+import hashlib
+import os
+from functools import lru_cache
+
+import pandas as pd
+
+
+def frame_fingerprint(df: pd.DataFrame) -> str:
+    """Compute a content hash of a dataframe.
+
+    Args:
+        df (pd.DataFrame): the dataframe to fingerprint
+
+    Returns:
+        str: hex digest of the columns, dtypes and row values
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(repr(list(zip(df.columns, df.dtypes.astype(str)))).encode())
+    digest.update(
+        pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes()
+    )
+    return digest.hexdigest()
+
+
+def fingerprint_bytes(data: bytes | memoryview) -> str:
+    """Content hash of a file's bytes."""
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+@lru_cache(maxsize=32)
+def _fingerprint_path(path: str, mtime_ns: int, size: int) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as file:
+        while chunk := file.read(1 << 20):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def fingerprint_file(path: str) -> str:
+    """Content hash of a file on disk, recomputed only when it changes.
+
+    Args:
+        path (str): path of the file
+
+    Returns:
+        str: hex digest of the file content
+    """
+    stat = os.stat(path)
+    return _fingerprint_path(path, stat.st_mtime_ns, stat.st_size)
@@ -0,0 +1,285 @@
+from dataclasses import dataclass
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+from hdr import datasets
+from hdr.datasets import Sources
+from hdr.trends import TrendPanel
+
+MODELS = {
+    "linear": "Linear trend",
+    "log-linear": "Log-linear trend",
+    "damped": "Damped trend",
+}
+FORECAST_YEAR = 2030
+# candidate damping factors of the damped trend, fitted per country: the
+# yearly gain shrinks by phi every year. phi = 1 is the linear trend
+PHI_GRID = np.round(np.arange(0.80, 1.0001, 0.01), 2)
+# years are centred on this one to keep the normal equations well scaled
+_T0 = 2000
+
+
+@dataclass
+class ForecastFit:
+    """Per-country trend coefficients, fitted for all countries at once."""
+
+    model: str
+    countries: np.ndarray
+    coef: np.ndarray
+    xtx_inv: np.ndarray
+    sigma: np.ndarray
+    last_year: np.ndarray
+    # damped trend only: the fitted phi of every country, and the year the
+    # damping starts from
+    phi: np.ndarray | None = None
+    origin: int = _T0
+
+
+def damped_trend(t: np.ndarray, phi: np.ndarray | float) -> np.ndarray:
+    """The damped trend regressor phi + phi^2 + ... + phi^t.
+
+    Args:
+        t (np.ndarray): years since the origin, shape (years,)
+        phi (np.ndarray | float): damping factor, or one per country
+
+    Returns:
+        np.ndarray: shape (countries, years), or (1, years) for one phi
+    """
+    phi = np.atleast_1d(np.asarray(phi, dtype=float))[:, None]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        damped = phi * (1 - phi**t) / (1 - phi)
+    return np.where(phi == 1, t, damped)
+
+
+def _design(
+    years: np.ndarray,
+    n: int,
+    phi: np.ndarray | float | None = None,
+    origin: int = _T0,
+) -> np.ndarray:
+    """The [1, trend] design matrices of n countries, (n, years, 2).
+
+    The trend is the centred year, or the damped trend if phi is given.
+    """
+    if phi is None:
+        trend = np.broadcast_to((years - _T0).astype(float), (n, len(years)))
+    else:
+        trend = np.broadcast_to(
+            damped_trend((years - origin).astype(float), phi),
+            (n, len(years)),
+        )
+    return np.stack([np.ones_like(trend), trend], axis=-1)
+
+
+def _wls(
+    X: np.ndarray, y: np.ndarray, weights: np.ndarray
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Weighted least squares of a stack of 2-parameter problems.
+
+    Args:
+        X (np.ndarray): design matrices, (countries, years, 2)
+        y (np.ndarray): targets, (countries, years); 0 where unweighted
+        weights (np.ndarray): weights, (countries, years)
+
+    Returns:
+        tuple[np.ndarray, np.ndarray, np.ndarray]: the coefficients, the
+        inverted normal matrices and the residual sums of squares
+    """
+    xtx = np.einsum("ct,cti,ctj->cij", weights, X, X)
+    xty = np.einsum("ct,cti,ct->ci", weights, X, y)
+    # countries with fewer than two points get a singular system: NaN
+    singular = np.abs(np.linalg.det(xtx)) < 1e-12
+    xtx[singular] = np.eye(2)
+    xtx_inv = np.linalg.inv(xtx)
+    xtx_inv[singular] = np.nan
+    coef = np.einsum("cij,cj->ci", xtx_inv, xty)
+    residuals = (y - np.einsum("cti,ci->ct", X, coef)) * weights
+    return coef, xtx_inv, (residuals**2).sum(axis=1)
+
+
+def _fit(panel: TrendPanel, weights: np.ndarray, model: str) -> ForecastFit:
+    """Weighted least squares of every country's trend in one batch.
+
+    Missing or held-out cells get weight 0. The normal equations of all
+    countries are a stack of 2x2 systems, solved together. The damped trend
+    is linear in its level and gain for a fixed phi: it is solved for every
+    phi of PHI_GRID, and each country keeps the phi with the smallest
+    residual sum of squares.
+    """
+    years, values = panel.years, panel.values
+    n = len(panel.countries)
+    y = values
+    if model == "log-linear":
+        with np.errstate(invalid="ignore", divide="ignore"):
+            y = np.log(values)
+    y = np.where(weights > 0, y, 0.0)
+
+    phi, origin, n_params = None, _T0, 2
+    if model == "damped":
+        origin, n_params = int(years[0]), 3
+        best = np.full(n, np.inf)
+        phi = np.ones(n)
+        for candidate in PHI_GRID:
+            X = _design(years, n, candidate, origin)
+            _, _, rss = _wls(X, y, weights)
+            better = rss < best - 1e-15
+            best[better], phi[better] = rss[better], candidate
+    X = _design(years, n, phi, origin)
+    coef, xtx_inv, rss = _wls(X, y, weights)
+
+    n_obs = weights.sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        # phi is estimated too: one more degree of freedom
+        sigma = np.sqrt(rss / (n_obs - n_params))
+    sigma[n_obs <= n_params] = np.nan
+
+    observed = weights > 0
+    last = np.where(observed, np.arange(len(years)), -1).max(axis=1)
+    last_year = np.where(last >= 0, years[np.maximum(last, 0)], -1)
+    return ForecastFit(
+        model=model,
+        countries=panel.countries,
+        coef=coef,
+        xtx_inv=xtx_inv,
+        sigma=sigma,
+        last_year=last_year,
+        phi=phi,
+        origin=origin,
+    )
+
+
+def fit_models(
+    panel: TrendPanel, cutoff: int | None = None
+) -> dict[str, ForecastFit]:
+    """Fit every model on the observed (not interpolated) panel cells.
+
+    Args:
+        panel (TrendPanel): the HDI panel
+        cutoff (int | None, optional): ignore years after this one.
+
+    Returns:
+        dict[str, ForecastFit]: the fit of every model in MODELS
+    """
+    weights = (panel.observed & (panel.values > 0)).astype(float)
+    if cutoff is not None:
+        weights[:, panel.years > cutoff] = 0.0
+    return {model: _fit(panel, weights, model) for model in MODELS}
+
+
+def predict(
+    fit: ForecastFit, years: np.ndarray, level: float = 0.95
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Point forecasts and prediction intervals of all countries.
+
+    Args:
+        fit (ForecastFit): the fitted model
+        years (np.ndarray): the years to predict
+        level (float, optional): coverage of the prediction interval.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray, np.ndarray]: mean, lower and upper
+        bound, each of shape (countries, years)
+    """
+    years = np.asarray(years)
+    X = _design(years, len(fit.countries), fit.phi, fit.origin)
+    z = NormalDist().inv_cdf(0.5 + level / 2)
+    # standard error of a new observation: sigma * sqrt(1 + x' (X'WX)^-1 x),
+    # given the fitted phi of the damped trend
+    leverage = np.einsum("cti,cij,ctj->ct", X, fit.xtx_inv, X)
+    spread = z * fit.sigma[:, None] * np.sqrt(1 + leverage)
+    mean = np.einsum("cti,ci->ct", X, fit.coef)
+
+    if fit.model == "log-linear":
+        lower, upper = np.exp(mean - spread), np.exp(mean + spread)
+        mean = np.exp(mean)
+    else:
+        lower, upper = mean - spread, mean + spread
+    # the HDI is bounded by 0 and 1
+    return tuple(np.clip(a, 0, 1) for a in (mean, lower, upper))
+
+
+def forecast_frame(
+    fit: ForecastFit, end: int = FORECAST_YEAR, level: float = 0.95
+) -> pd.DataFrame:
+    """Forecasts of all countries from their last observed year to `end`.
+
+    Args:
+        fit (ForecastFit): the fitted model
+        end (int, optional): last forecast year. Defaults to FORECAST_YEAR.
+        level (float, optional): coverage of the prediction interval.
+
+    Returns:
+        pd.DataFrame: long format with country, year, hdi, lower and upper
+    """
+    start = int(fit.last_year[fit.last_year > 0].min(initial=end)) + 1
+    years = np.arange(start, end + 1)
+    mean, lower, upper = predict(fit, years, level)
+    frame = pd.DataFrame(
+        {
+            "country": np.repeat(fit.countries, len(years)),
+            "year": np.tile(years, len(fit.countries)),
+            "hdi": mean.ravel(),
+            "lower": lower.ravel(),
+            "upper": upper.ravel(),
+        }
+    )
+    # only forecast beyond each country's own last observation
+    last_year = np.repeat(fit.last_year, len(years))
+    return frame[(frame["year"] > last_year) & frame["hdi"].notna()]
+
+
+def backtest(panel: TrendPanel, holdout: int = 3) -> pd.DataFrame:
+    """Hold out the last observed years and score every model on them.
+
+    Args:
+        panel (TrendPanel): the HDI panel
+        holdout (int, optional): number of observed years held out.
+
+    Returns:
+        pd.DataFrame: MAE, RMSE and interval coverage by model
+    """
+    observed_years = panel.years[panel.observed.any(axis=0)]
+    test_years = observed_years[-holdout:]
+    cutoff = int(observed_years[-holdout - 1])
+    columns = np.searchsorted(panel.years, test_years)
+    actual = np.where(
+        panel.observed[:, columns], panel.values[:, columns], np.nan
+    )
+
+    scores = {}
+    for model, fit in fit_models(panel, cutoff=cutoff).items():
+        mean, lower, upper = predict(fit, test_years)
+        error = mean - actual
+        valid = ~np.isnan(error)
+        scores[MODELS[model]] = {
+            "MAE": np.abs(error[valid]).mean(),
+            "RMSE": np.sqrt((error[valid] ** 2).mean()),
+            "interval coverage": ((actual >= lower) & (actual <= upper))[
+                valid
+            ].mean(),
+        }
+    return pd.DataFrame.from_dict(scores, orient="index")
+
+
+@datasets.graph.node("trends_panel")
+def forecasts(
+    panel: TrendPanel,
+) -> tuple[dict[str, ForecastFit], pd.DataFrame]:
+    """Fits of all models and their backtest."""
+    return fit_models(panel), backtest(panel)
+
+
+def cached_forecasts(
+    sources: Sources,
+) -> tuple[dict[str, ForecastFit], pd.DataFrame]:
+    """Fits of all models and their backtest, computed once per dataset.
+
+    Args:
+        sources (Sources): the annex sources, with the HDI trends sheet
+
+    Returns:
+        tuple[dict[str, ForecastFit], pd.DataFrame]: fits and backtest scores
+    """
+    return datasets.get("forecasts", sources)
@@ -0,0 +1,259 @@
+"""Run the batch analysis (analyze_hdr.py) as a background job.
+
+The analysis runs in a spawned process, so a dashboard session that starts
+it is not blocked; the script reports its stage and saved figures through
+report_progress, which the runner collects in a monitor thread. Jobs are
+keyed by the hash of the workbook: asking again for a workbook that is
+queued or running returns the existing job. At most one job runs at a time
+(every run writes the same output directories) and a few more can wait.
+
+Kept free of streamlit imports, so spawning the job process stays cheap.
+"""
+
+import itertools
+import os
+import queue
+import sys
+import tempfile
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from multiprocessing import get_context
+from pathlib import Path
+
+from hdr.config import annex_path, get_setting
+from hdr.fingerprints import fingerprint_file
+
+SCRIPT = Path(__file__).resolve().parent.parent / "analyze_hdr.py"
+LOG_DIR = Path(tempfile.gettempdir()) / "hdr_jobs"
+# stages reported by analyze_hdr.py, in order
+STAGES = (
+    "load",
+    "describe",
+    "missing values",
+    "outliers",
+    "distributions",
+    "correlation",
+    "top countries",
+)
+# jobs that may wait behind the running one
+MAX_QUEUED = 4
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = (
+    "queued",
+    "running",
+    "done",
+    "failed",
+    "cancelled",
+)
+
+# set in the job process: where report_progress sends its updates
+_progress = None
+
+
+class JobQueueFull(RuntimeError):
+    """The queue of analysis jobs is full."""
+
+
+@dataclass
+class Job:
+    """One run of the batch analysis of a workbook."""
+
+    id: int
+    fingerprint: str
+    path: str
+    log: Path
+    state: str = QUEUED
+    stage: str | None = None
+    figures: int = 0
+    error: str | None = None
+    started: float | None = None
+    finished: float | None = None
+    process: object = field(default=None, repr=False)
+
+    @property
+    def active(self) -> bool:
+        """True while the job is queued or running."""
+        return self.state in (QUEUED, RUNNING)
+
+    @property
+    def fraction(self) -> float:
+        """Share of the stages already reached, for a progress bar."""
+        if self.state == DONE:
+            return 1.0
+        if self.stage not in STAGES:
+            return 0.0
+        return STAGES.index(self.stage) / len(STAGES)
+
+
+def report_progress(stage: str | None = None, figure: str | None = None):
+    """Report the stage or a saved figure of the running analysis.
+
+    A no-op unless the script runs as a job, so analyze_hdr.py still runs by
+    hand unchanged.
+
+    Args:
+        stage (str | None, optional): the stage that starts, one of STAGES
+        figure (str | None, optional): path of a figure that was saved
+    """
+    if _progress is not None:
+        _progress.put((stage, figure))
+
+
+def _run(script: str, path: str, log: str, progress) -> None:
+    """Entry point of the job process: run the script, output to the log."""
+    global _progress
+    _progress = progress
+    import runpy
+
+    os.environ.setdefault("MPLBACKEND", "Agg")
+    # analyze_hdr.py reads the workbook given as its first argument
+    sys.argv = [script, path]
+    with open(log, "w", buffering=1) as output:
+        sys.stdout = sys.stderr = output
+        runpy.run_path(script, run_name="__main__")
+
+
+class JobRunner:
+    """A bounded queue of analysis jobs, run one at a time."""
+
+    def __init__(self, max_queued: int = MAX_QUEUED, script: Path = SCRIPT):
+        self.max_queued = max_queued
+        self.script = script
+        self._jobs: dict[str, Job] = {}
+        self._queue: deque[Job] = deque()
+        self._running: Job | None = None
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._context = get_context("spawn")
+
+    def submit(self, path: str | None = None) -> Job:
+        """Queue the analysis of a workbook, unless it is already queued.
+
+        Args:
+            path (str | None, optional): the workbook. defaults to the
+                default annex workbook.
+
+        Returns:
+            Job: the new job, or the queued or running job of the same
+            workbook content
+
+        Raises:
+            JobQueueFull: if max_queued jobs are already waiting
+        """
+        path = path or annex_path()
+        fingerprint = fingerprint_file(path)
+        with self._lock:
+            job = self._jobs.get(fingerprint)
+            if job is not None and job.active:
+                return job
+            if len(self._queue) >= self.max_queued:
+                raise JobQueueFull(
+                    f"{len(self._queue)} analyses are already waiting"
+                )
+            job_id = next(self._ids)
+            LOG_DIR.mkdir(parents=True, exist_ok=True)
+            job = Job(
+                id=job_id,
+                fingerprint=fingerprint,
+                path=path,
+                log=LOG_DIR / f"{job_id}-{fingerprint}.log",
+            )
+            self._jobs[fingerprint] = job
+            self._queue.append(job)
+        self._dispatch()
+        return job
+
+    def cancel(self, job: Job) -> None:
+        """Remove a queued job, or stop a running one."""
+        with self._lock:
+            if job.state == QUEUED:
+                self._queue.remove(job)
+                job.state, job.finished = CANCELLED, time.time()
+                return
+            if job.state != RUNNING:
+                return
+            job.state = CANCELLED
+        job.process.terminate()
+
+    def job(self, fingerprint: str) -> Job | None:
+        """The latest job of a workbook content, if any."""
+        with self._lock:
+            return self._jobs.get(fingerprint)
+
+    def jobs(self) -> list[Job]:
+        """The latest job of every workbook content, newest first."""
+        with self._lock:
+            return sorted(self._jobs.values(), key=lambda j: -j.id)
+
+    def _dispatch(self) -> None:
+        with self._lock:
+            if self._running is not None or not self._queue:
+                return
+            job = self._running = self._queue.popleft()
+            progress = self._context.Queue()
+            job.process = self._context.Process(
+                target=_run,
+                args=(str(self.script), job.path, str(job.log), progress),
+                name=f"hdr-analysis-{job.id}",
+                daemon=True,
+            )
+            job.state, job.started = RUNNING, time.time()
+            job.process.start()
+        threading.Thread(
+            target=self._monitor, args=(job, progress), daemon=True
+        ).start()
+
+    def _monitor(self, job: Job, progress) -> None:
+        # collect the updates until the process has exited and the queue is
+        # drained
+        while True:
+            try:
+                stage, figure = progress.get(timeout=0.5)
+            except queue.Empty:
+                if not job.process.is_alive():
+                    break
+                continue
+            if stage is not None:
+                job.stage = stage
+            if figure is not None:
+                job.figures += 1
+        job.process.join()
+        with self._lock:
+            if job.state == RUNNING:
+                if job.process.exitcode == 0:
+                    job.state = DONE
+                else:
+                    job.state = FAILED
+                    job.error = _tail(job.log)
+            job.finished = time.time()
+            self._running = None
+        progress.close()
+        self._dispatch()
+
+
+def _tail(path: Path, lines: int = 10) -> str:
+    """The last lines of a job log."""
+    try:
+        with open(path) as log:
+            return "".join(deque(log, maxlen=lines))
+    except OSError:
+        return ""
+
+
+_runner: JobRunner | None = None
+_runner_lock = threading.Lock()
+
+
+def get_runner() -> JobRunner:
+    """The job runner of the process, created on first use.
+
+    `max_queued_jobs` in config.env bounds the queue (default 4).
+    """
+    global _runner
+    with _runner_lock:
+        if _runner is None:
+            max_queued = get_setting("max_queued_jobs", "") or MAX_QUEUED
+            _runner = JobRunner(max_queued=int(max_queued))
+        return _runner
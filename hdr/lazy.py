@@ -0,0 +1,47 @@
+import importlib
+import importlib.util
+import sys
+import threading
+from types import ModuleType
+
+
+class _LazyModule(ModuleType):
+    """Stands in for a module until its first attribute access.
+
+    The first access imports the real module under a lock, with
+    importlib.import_module: concurrent sessions wait for one complete
+    import instead of running the module twice or seeing it half
+    initialised, as importlib.util.LazyLoader allows.
+    """
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        self._lock = threading.Lock()
+        self._module: ModuleType | None = None
+
+    def __getattr__(self, attr: str):
+        # only called for names the stand-in itself does not have
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    self._module = importlib.import_module(self.__name__)
+        return getattr(self._module, attr)
+
+
+def lazy_import(name: str) -> ModuleType:
+    """Return a module whose code only runs on first attribute access.
+
+    Used for heavy plotting libraries, so importing a page or script does not
+    pay for them until a chart is actually drawn.
+
+    Args:
+        name (str): the dotted module name, e.g. "plotly.express"
+
+    Returns:
+        ModuleType: the module, or a stand-in that imports it on first use
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    if importlib.util.find_spec(name) is None:
+        raise ModuleNotFoundError(f"No module named {name!r}", name=name)
+    return _LazyModule(name)
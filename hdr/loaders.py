@@ -0,0 +1,176 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from multiprocessing import get_context
+from typing import BinaryIO
+
+import pandas as pd
+import streamlit as st
+
+from hdr import shared
+from hdr.config import annex_path, get_setting
+from hdr.fingerprints import fingerprint_bytes, fingerprint_file
+from hdr.schema import SchemaDriftError
+from hdr.workers import read_excel
+
+# number of parsed (workbook, sheet) entries kept in memory
+MAX_LOADED = 16
+
+_lock = threading.Lock()
+_pool: ProcessPoolExecutor | None = None
+_futures: OrderedDict[tuple[str, str | None], Future] = OrderedDict()
+
+
+def fingerprint_upload(uploaded_file: BinaryIO) -> str:
+    """Content hash of an uploaded file, computed once per upload.
+
+    The hash is memoized in the session state by the upload's file id, so
+    reruns of the page never rehash the file's bytes.
+
+    Args:
+        uploaded_file (BinaryIO): the file returned by st.file_uploader
+
+    Returns:
+        str: hex digest of the file content
+    """
+    fingerprints = st.session_state.setdefault("upload_fingerprints", {})
+    file_id = uploaded_file.file_id
+    if file_id not in fingerprints:
+        fingerprints[file_id] = fingerprint_bytes(uploaded_file.getbuffer())
+    return fingerprints[file_id]
+
+
+def _loader_pool() -> ProcessPoolExecutor:
+    """The process pool shared by all sessions, created on first use."""
+    global _pool
+    with _lock:
+        if _pool is None:
+            workers = int(get_setting("loader_workers", "2") or 2)
+            # spawn: forking a multi-threaded streamlit server is unsafe
+            _pool = ProcessPoolExecutor(
+                max_workers=workers, mp_context=get_context("spawn")
+            )
+        return _pool
+
+
+def _fingerprint(file: str | BinaryIO) -> str:
+    if isinstance(file, str):
+        return fingerprint_file(file)
+    return fingerprint_upload(file)
+
+
+def submit_workbook(
+    file: str | BinaryIO, sheet_name: str | None = None
+) -> tuple[str, Future]:
+    """Start parsing a workbook in the loader pool and return at once.
+
+    Parses are keyed by (content fingerprint, sheet): every session asking
+    for the same content gets the same future, and therefore the same
+    frames, without a second parse or copy. The frames are shared objects;
+    callers must not modify them. Failed parses are retried on the next
+    call. Call .result() on the future only where the data is needed, so
+    independent sources are parsed concurrently.
+
+    Args:
+        file (str | BinaryIO): path or uploaded file of the workbook
+        sheet_name (str | None, optional): the sheet to load. all if None.
+
+    Returns:
+        tuple[str, Future]: the content fingerprint and the parse future
+    """
+    fingerprint = _fingerprint(file)
+    key = (fingerprint, sheet_name)
+    pool = _loader_pool()
+    with _lock:
+        future = _futures.get(key)
+        if future is None or (future.done() and future.exception()):
+            source = file if isinstance(file, str) else file.getvalue()
+            future = pool.submit(read_excel, source, sheet_name)
+            _futures[key] = future
+        _futures.move_to_end(key)
+        while len(_futures) > MAX_LOADED:
+            _futures.popitem(last=False)
+    return fingerprint, future
+
+
+def load_workbook(file: str | BinaryIO) -> tuple[str, dict[str, pd.DataFrame]]:
+    """Fingerprint a workbook (path or upload) and return its shared sheets.
+
+    With shared data on, a workbook already published by another process is
+    attached instead of parsed, and the default workbook is published once
+    parsed. Uploads are never published: they stay in the session.
+
+    Args:
+        file (str | BinaryIO): path or uploaded file of the workbook
+
+    Returns:
+        tuple[str, dict[str, pd.DataFrame]]: the fingerprint and the sheets
+    """
+    fingerprint = _fingerprint(file)
+    if shared.is_published(fingerprint):
+        return fingerprint, shared.attach(fingerprint)
+    fingerprint, future = submit_workbook(file)
+    with st.spinner("Loading data..."):
+        sheets = future.result()
+    if file == annex_path():
+        try:
+            shared.publish(fingerprint, sheets)
+        except SchemaDriftError:
+            # not published; the EDA page reports the drift
+            pass
+    return fingerprint, sheets
+
+
+def load_published() -> tuple[str, dict[str, pd.DataFrame]] | None:
+    """The current workbook published by the loader process, if any.
+
+    Cheap enough to call on every rerun: it reads the small CURRENT file,
+    and each version is only mapped once per process.
+
+    Returns:
+        tuple[str, dict[str, pd.DataFrame]] | None: the fingerprint and the
+        sheets, None if shared data is off or nothing is published
+    """
+    fingerprint = shared.current_version()
+    if fingerprint is None or not shared.is_published(fingerprint):
+        return None
+    return fingerprint, shared.attach(fingerprint)
+
+
+def load_latest() -> tuple[str, dict[str, pd.DataFrame]] | None:
+    """The latest version of the default workbook, without blocking.
+
+    The workbook published by the loader process wins; otherwise the last
+    version fully parsed by the data watcher. While the watcher parses a
+    changed file, the previous version is returned.
+
+    Returns:
+        tuple[str, dict[str, pd.DataFrame]] | None: the fingerprint and the
+        sheets, None if neither shared data nor the watcher is on
+    """
+    from hdr.watcher import current_version
+
+    published = load_published()
+    if published is not None:
+        return published
+    version = current_version(annex_path())
+    if version is None:
+        return None
+    return version.fingerprint, version.data
+
+
+def sync_session_data() -> None:
+    """Switch a session on the default workbook to its latest version.
+
+    Sessions that uploaded their own workbook keep it. Called at the top of
+    every page, so an open session picks up a new version on its next
+    rerun and keeps its frames until then.
+    """
+    if st.session_state.get("data_source") != "default":
+        return
+    latest = load_latest()
+    if latest is not None:
+        fingerprint, sheets = latest
+        if st.session_state.get("data_fingerprint") != fingerprint:
+            st.session_state["data"] = sheets
+            st.session_state["data_fingerprint"] = fingerprint
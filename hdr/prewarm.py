@@ -0,0 +1,33 @@
+import os
+import threading
+
+from hdr.config import annex_path, get_flag, pop_gnipc_path
+
+_lock = threading.Lock()
+_started = False
+
+
+def start_prewarm() -> bool:
+    """Start parsing the default workbooks into the shared loader cache.
+
+    Opt-in with `prewarm=true` in config.env. Only the first call per process
+    submits the parses to the loader pool; later calls are no-ops. The call
+    returns immediately, the parsing runs in the loader worker processes.
+
+    Returns:
+        bool: True if the parses were started by this call
+    """
+    global _started
+    from hdr.loaders import submit_workbook
+
+    with _lock:
+        if _started or not get_flag("prewarm"):
+            return False
+        if not os.path.exists(annex_path()):
+            return False
+        _started = True
+    # same arguments as the pages use, so they get the same futures
+    submit_workbook(annex_path())
+    if os.path.exists(pop_gnipc_path()):
+        submit_workbook(pop_gnipc_path(), "Sheet1")
+    return True
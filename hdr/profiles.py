@@ -0,0 +1,188 @@
+import re
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from hdr import datasets
+from hdr.datasets import Sources
+from hdr.schema import TRENDS_SCHEMA, SchemaDriftError
+from hdr.trends import TrendPanel
+
+COUNTRY_COLUMNS = ("Country", "country")
+TRENDS_TABLE = "HDI trends panel"
+POP_GNIPC_TABLE = "Population and GNI"
+
+
+def country_key(name: str) -> str:
+    """Normalized id of a country name: case, spacing and footnotes ignored.
+
+    e.g. "Côte d'Ivoire", " côte d'ivoire " and "Côte d'Ivoire a" share
+    one id.
+    """
+    name = re.sub(r"\s+", " ", str(name)).strip().casefold()
+    return re.sub(r" [a-z]$", "", name)
+
+
+def country_keys(names: pd.Series) -> pd.Series:
+    """country_key of a whole column, with vectorized string methods."""
+    return (
+        names.astype("string")
+        .str.replace(r"\s+", " ", regex=True)
+        .str.strip()
+        .str.casefold()
+        .str.replace(r" [a-z]$", "", regex=True)
+    )
+
+
+@dataclass
+class CountryIndex:
+    """Row offsets of every country in every indexed table."""
+
+    names: dict[str, str]
+    offsets: dict[str, dict[str, int]]
+
+    def countries(self) -> list[str]:
+        """Display names of all indexed countries, sorted."""
+        return sorted(self.names.values())
+
+    def locate(self, country: str) -> dict[str, int]:
+        """Row offset of a country in every table that has it."""
+        key = country_key(country)
+        return {
+            table: rows[key]
+            for table, rows in self.offsets.items()
+            if key in rows
+        }
+
+
+def _offsets(names: pd.Series) -> dict[str, int]:
+    keys = country_keys(names)
+    # the first row of a country wins, as in a filtered scan
+    first = ~keys.duplicated() & keys.notna()
+    return dict(zip(keys[first], np.flatnonzero(first.to_numpy())))
+
+
+def build_country_index(
+    tables: dict[str, pd.DataFrame], panel: TrendPanel | None = None
+) -> CountryIndex:
+    """Index the rows of every country in all tables, in one pass per table.
+
+    Args:
+        tables (dict[str, pd.DataFrame]): tables with a Country column;
+            tables without one are skipped
+        panel (TrendPanel | None, optional): the HDI trends panel.
+
+    Returns:
+        CountryIndex: the index
+    """
+    offsets, names = {}, {}
+    for table, df in tables.items():
+        column = next((c for c in COUNTRY_COLUMNS if c in df.columns), None)
+        if column is None:
+            continue
+        offsets[table] = _offsets(df[column])
+        for key, row in offsets[table].items():
+            names.setdefault(key, str(df[column].iloc[row]).strip())
+    if panel is not None:
+        offsets[TRENDS_TABLE] = _offsets(pd.Series(panel.countries))
+    return CountryIndex(names=names, offsets=offsets)
+
+
+@datasets.graph.node("annex", "pop_gnipc", "trends_panel")
+def country_index(
+    annex: dict[str, pd.DataFrame],
+    pop_gnipc: pd.DataFrame,
+    panel: TrendPanel,
+) -> CountryIndex:
+    """The country index of the annex sheets, pop_gnipc and the panel."""
+    return build_country_index({**annex, POP_GNIPC_TABLE: pop_gnipc}, panel)
+
+
+@datasets.graph.node("annex", "pop_gnipc")
+def annex_country_index(
+    annex: dict[str, pd.DataFrame], pop_gnipc: pd.DataFrame
+) -> CountryIndex:
+    """The country index of a workbook without an HDI trends sheet."""
+    return build_country_index({**annex, POP_GNIPC_TABLE: pop_gnipc})
+
+
+def cached_country_index(sources: Sources) -> CountryIndex:
+    """The country index, built once per (workbook, pop_gnipc) content.
+
+    The HDI trends panel is indexed too if the workbook has its sheet and
+    the sheet matches TRENDS_SCHEMA.
+    """
+    if f"sheet:{TRENDS_SCHEMA.name}" in sources:
+        try:
+            return datasets.get("country_index", sources)
+        except SchemaDriftError:
+            # index the annex tables only; get_country_profile reports it
+            pass
+    return datasets.get("annex_country_index", sources)
+
+
+@dataclass
+class CountryProfile:
+    """Everything the data says about one country."""
+
+    country: str
+    rows: dict[str, pd.Series]
+    trend: pd.DataFrame | None
+    # why the HDI trends sheet could not be read, if it drifted
+    drift: str | None = None
+
+
+def get_country_profile(country: str, sources: Sources) -> CountryProfile:
+    """Collect the rows of a country from every table through the index.
+
+    The index is built once per workbook; a profile is then one row lookup
+    per table.
+
+    Args:
+        country (str): name of the country, in any case or spacing
+        sources (Sources): the "annex" and "pop_gnipc" sources
+
+    Returns:
+        CountryProfile: the row of the country in every table that has it,
+        and its annual HDI, rank and interpolation flag. without the trend
+        if the HDI trends sheet does not match TRENDS_SCHEMA
+
+    Raises:
+        KeyError: if no table has the country
+    """
+    index = cached_country_index(sources)
+    located = index.locate(country)
+    if not located:
+        raise KeyError(f"unknown country: {country}")
+    tables = {
+        **datasets.get("annex", sources),
+        POP_GNIPC_TABLE: datasets.get("pop_gnipc", sources),
+    }
+    rows = {
+        table: tables[table].iloc[row]
+        for table, row in located.items()
+        if table != TRENDS_TABLE
+    }
+    trend = drift = None
+    if f"sheet:{TRENDS_SCHEMA.name}" in sources:
+        try:
+            panel = datasets.get("trends_panel", sources)
+        except SchemaDriftError as error:
+            drift = str(error)
+    if drift is None and TRENDS_TABLE in located:
+        row = located[TRENDS_TABLE]
+        trend = pd.DataFrame(
+            {
+                "year": panel.years,
+                "hdi": panel.values[row],
+                "rank": panel.ranks[row],
+                "interpolated": ~panel.observed[row],
+            }
+        )
+    return CountryProfile(
+        country=index.names[country_key(country)],
+        rows=rows,
+        trend=trend,
+        drift=drift,
+    )
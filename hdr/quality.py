@@ -0,0 +1,304 @@
+"""Data-quality profile of every sheet of a workbook, computed once.
+
+Each sheet is profiled in one vectorized pass: its data columns are coerced
+as one block (see coerce_numeric), which yields the null, sentinel and
+number counts and the numeric values at once; the missing-value mask of the
+coerced block gives the ranges and the missing-pattern signatures, and the
+country column the duplicate keys. The profile is kept next to the columnar
+store of the workbook, so the dashboard and the batch report read it
+instead of scanning the data again.
+"""
+
+import os
+import re
+import shutil
+import tempfile
+import threading
+import warnings
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from hdr.coercion import FLAG_PATTERN, coerce_numeric
+from hdr.profiles import COUNTRY_COLUMNS, country_keys
+from hdr.schema import IGNORED_COLUMNS, normalize
+from hdr.store import QUALITY_SUFFIX, STORE_DIR, evict_stores
+
+# the tables of a profile, one Parquet file each
+TABLES = ("columns", "patterns", "duplicates")
+# profiles kept in memory
+MAX_PROFILES = 4
+# the columns of each table, with their types
+FIELDS = {
+    "columns": {
+        "sheet": object,
+        "column": object,
+        "numeric": bool,
+        "cells": int,
+        "nulls": int,
+        "sentinels": int,
+        "numbers": int,
+        "invalid": int,
+        "missing": int,
+        "min": float,
+        "max": float,
+    },
+    "patterns": {
+        "sheet": object,
+        "signature": object,
+        "missing_columns": object,
+        "rows": int,
+        "example": object,
+    },
+    "duplicates": {"sheet": object, "country": object, "rows": int},
+}
+
+
+@dataclass
+class QualityReport:
+    """The data-quality profile of the sheets of a workbook.
+
+    Attributes:
+        columns: one row per sheet and data column: cells, nulls, sentinels,
+            numbers, invalid (text in a numeric column), missing, min, max
+        patterns: one row per sheet and missing-value pattern: the
+            signature (one "1" per missing column), the missing columns,
+            the number of rows and the first country with the pattern
+        duplicates: one row per sheet and country key on several rows
+    """
+
+    columns: pd.DataFrame
+    patterns: pd.DataFrame
+    duplicates: pd.DataFrame
+
+    def summary(self) -> pd.DataFrame:
+        """One row per sheet: rows, columns, complete rows and problems."""
+        columns = self.columns.groupby("sheet", sort=False)
+        patterns = self.patterns.groupby("sheet", sort=False)
+        complete = self.patterns[self.patterns["missing_columns"] == ""]
+        return (
+            pd.DataFrame(
+                {
+                    "rows": patterns["rows"].sum(),
+                    "columns": columns.size(),
+                    "complete rows": complete.groupby("sheet")["rows"].sum(),
+                    "missing cells": columns["missing"].sum(),
+                    "sentinels": columns["sentinels"].sum(),
+                    "duplicate countries": self.duplicates.groupby(
+                        "sheet"
+                    ).size(),
+                }
+            )
+            .reindex(self.columns["sheet"].unique())
+            .fillna(0)
+            .astype(int)
+        )
+
+    def sheet(self, name: str) -> "QualityReport":
+        """The profile of one sheet."""
+        return QualityReport(
+            *(
+                table[table["sheet"] == name].reset_index(drop=True)
+                for table in (self.columns, self.patterns, self.duplicates)
+            )
+        )
+
+
+def _empty_report() -> QualityReport:
+    """A profile without rows, e.g. of a notes or cover sheet."""
+    return QualityReport(
+        *(
+            pd.DataFrame(
+                {name: pd.Series(dtype=t) for name, t in FIELDS[table].items()}
+            )
+            for table in TABLES
+        )
+    )
+
+
+def _is_footnote_column(name, values: pd.Series) -> bool:
+    """Whether a column is a spacer or footnote-flag column of the tables.
+
+    Its header looks like one ("Unnamed: 3" or a single letter) and it
+    holds nothing but footnote letters, so a data column that happens to
+    be named "a" is still profiled.
+    """
+    if not re.match(IGNORED_COLUMNS, normalize(name)):
+        return False
+    text = values.dropna().astype(str).str.strip()
+    return bool(text.str.fullmatch(FLAG_PATTERN).all())
+
+
+def _data_columns(df: pd.DataFrame) -> list:
+    """The columns of a sheet without the spacer and footnote columns."""
+    return [col for col in df.columns if not _is_footnote_column(col, df[col])]
+
+
+def profile_sheet(name: str, df: pd.DataFrame) -> QualityReport:
+    """Profile one sheet in one pass over its cells.
+
+    A column counts as numeric when at least half of its values are numbers,
+    the same rule as the columnar store; only numeric columns get a range,
+    and their invalid cells count as missing.
+
+    Args:
+        name (str): the name of the sheet
+        df (pd.DataFrame): the raw sheet
+
+    Returns:
+        QualityReport: the profile of the sheet
+    """
+    columns = _data_columns(df)
+    if not columns or df.empty:
+        # nothing to profile, e.g. a notes or cover sheet
+        return _empty_report()
+    data = df[columns]
+    coerced = coerce_numeric(data)
+    counts = coerced.report.reset_index(drop=True)
+    non_null = len(df) - counts["missing"]
+    numeric = ((counts["numbers"] + counts["parsed"]) * 2 >= non_null) & (
+        non_null > 0
+    )
+
+    values = coerced.frame.to_numpy(dtype=float)
+    # missing: no value, or no number in a numeric column
+    missing = np.where(
+        numeric.to_numpy(), np.isnan(values), data.isna().to_numpy()
+    )
+    with warnings.catch_warnings():
+        # columns without numbers have no range
+        warnings.simplefilter("ignore", RuntimeWarning)
+        low, high = np.nanmin(values, axis=0), np.nanmax(values, axis=0)
+
+    column_table = pd.DataFrame(
+        {
+            "sheet": name,
+            "column": [str(col) for col in columns],
+            "numeric": numeric,
+            "cells": len(df),
+            "nulls": counts["missing"],
+            "sentinels": counts["sentinels"],
+            "numbers": counts["numbers"] + counts["parsed"],
+            "invalid": np.where(numeric, counts["invalid"], 0),
+            "missing": missing.sum(axis=0),
+            "min": np.where(numeric, low, np.nan),
+            "max": np.where(numeric, high, np.nan),
+        }
+    )
+
+    # one signature per row: the missing mask packed into bytes, so the
+    # patterns are counted with one np.unique over the rows
+    packed = np.packbits(missing, axis=1)
+    _, first, rows = np.unique(
+        packed, axis=0, return_index=True, return_counts=True
+    )
+    country = next((c for c in COUNTRY_COLUMNS if c in df.columns), None)
+    names = np.array([str(col) for col in columns], dtype=object)
+    pattern_table = pd.DataFrame(
+        {
+            "sheet": name,
+            "signature": [
+                "".join("1" if m else "0" for m in missing[i]) for i in first
+            ],
+            "missing_columns": [", ".join(names[missing[i]]) for i in first],
+            "rows": rows,
+            "example": (
+                df[country].iloc[first].astype(str).to_numpy()
+                if country
+                else first
+            ),
+        }
+    ).sort_values("rows", ascending=False, ignore_index=True)
+
+    repeated = pd.Series(dtype=int)
+    if country is not None:
+        repeated = country_keys(df[country]).dropna().value_counts()
+        repeated = repeated[repeated > 1]
+    duplicate_table = pd.DataFrame(
+        {
+            "sheet": name,
+            "country": repeated.index.astype(str),
+            "rows": repeated.to_numpy(),
+        }
+    )
+    return QualityReport(column_table, pattern_table, duplicate_table)
+
+
+def profile_workbook(sheets: dict[str, pd.DataFrame]) -> QualityReport:
+    """Profile every sheet of a workbook.
+
+    Args:
+        sheets (dict[str, pd.DataFrame]): the raw sheets by name
+
+    Returns:
+        QualityReport: the profiles of all sheets
+    """
+    reports = [profile_sheet(name, df) for name, df in sheets.items()]
+    return QualityReport(
+        *(
+            pd.concat(
+                [getattr(report, table) for report in reports],
+                ignore_index=True,
+            )
+            for table in TABLES
+        )
+    )
+
+
+def _write(directory: Path, report: QualityReport) -> None:
+    """Write a profile in one rename, like the columnar store."""
+    STORE_DIR.mkdir(parents=True, exist_ok=True)
+    tmp = Path(tempfile.mkdtemp(dir=STORE_DIR, prefix=".tmp-"))
+    for table in TABLES:
+        getattr(report, table).to_parquet(tmp / f"{table}.parquet")
+    try:
+        os.rename(tmp, directory)
+    except OSError:
+        # another process profiled the same workbook first
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+_profiles: OrderedDict[str, QualityReport] = OrderedDict()
+_lock = threading.Lock()
+
+
+def quality_report(
+    fingerprint: str, sheets: dict[str, pd.DataFrame]
+) -> QualityReport:
+    """The profile of a workbook, computed once per workbook content.
+
+    The profile is kept in memory and in the store directory of the
+    workbook, so other processes (e.g. the batch analysis) read it too.
+
+    Args:
+        fingerprint (str): content hash of the workbook
+        sheets (dict[str, pd.DataFrame]): the raw sheets by name
+
+    Returns:
+        QualityReport: the profiles of all sheets
+    """
+    with _lock:
+        if fingerprint in _profiles:
+            _profiles.move_to_end(fingerprint)
+            return _profiles[fingerprint]
+    directory = STORE_DIR / f"{fingerprint}{QUALITY_SUFFIX}"
+    if directory.exists():
+        report = QualityReport(
+            *(
+                pd.read_parquet(directory / f"{table}.parquet")
+                for table in TABLES
+            )
+        )
+    else:
+        report = profile_workbook(sheets)
+        _write(directory, report)
+    # kept, and removed, together with the columnar store of the workbook
+    evict_stores(keep=directory)
+    with _lock:
+        _profiles[fingerprint] = report
+        while len(_profiles) > MAX_PROFILES:
+            _profiles.popitem(last=False)
+    return report
@@ -0,0 +1,303 @@
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from multiprocessing import get_context
+
+import numpy as np
+import pandas as pd
+
+from hdr import datasets
+from hdr.config import get_setting
+from hdr.datasets import Sources
+
+GNI_COLUMN = "Gross national income (GNI) per capita"
+METHODS = ("ols", "huber")
+
+# bootstrap replicates are drawn and solved in batches of this size
+BOOT_BATCH = 500
+# tuning constant of the Huber loss (95% efficiency under normal errors)
+HUBER_K = 1.345
+HUBER_MAX_ITER = 50
+
+_lock = threading.Lock()
+_pool: ProcessPoolExecutor | None = None
+_pool_workers = 0
+
+
+@dataclass(frozen=True)
+class RegressionSpec:
+    """Specification of a regression model on the cleaned annex data."""
+
+    target: str
+    features: tuple[str, ...]
+    log_gni: bool = False
+    method: str = "ols"
+
+
+@dataclass
+class RegressionResult:
+    """Point estimates and bootstrap draws of a fitted regression."""
+
+    spec: RegressionSpec
+    terms: list[str]
+    coef: np.ndarray
+    r_squared: float
+    n_obs: int
+    draws: np.ndarray
+
+    def summary(self, ci: float = 0.95) -> pd.DataFrame:
+        """Tabulate the coefficients with percentile confidence intervals.
+
+        Args:
+            ci (float, optional): confidence level. Defaults to 0.95.
+
+        Returns:
+            pd.DataFrame: one row per term
+        """
+        alpha = (1 - ci) / 2
+        low, high = np.quantile(self.draws, [alpha, 1 - alpha], axis=0)
+        return pd.DataFrame(
+            {
+                "coefficient": self.coef,
+                "std. error (bootstrap)": self.draws.std(axis=0, ddof=1),
+                f"{ci:.0%} CI low": low,
+                f"{ci:.0%} CI high": high,
+            },
+            index=pd.Index(self.terms, name="term"),
+        )
+
+    def predict(self, df: pd.DataFrame) -> pd.Series:
+        """Predict the target for the rows of a dataframe.
+
+        Args:
+            df (pd.DataFrame): the cleaned annex dataframe
+
+        Returns:
+            pd.Series: the prediction of every row, indexed like df; NaN
+            where a regressor is missing
+        """
+        data, _ = _model_data(df, self.spec, with_target=False)
+        complete = data.notna().all(axis=1).to_numpy()
+        predicted = np.full(len(df), np.nan)
+        predicted[complete] = _regressors(data[complete], self.spec) @ (
+            self.coef
+        )
+        return pd.Series(predicted, index=df.index, name=self.spec.target)
+
+
+def _model_data(
+    df: pd.DataFrame, spec: RegressionSpec, with_target: bool = True
+) -> tuple[pd.DataFrame, list[str]]:
+    """The numeric (and log-transformed) model columns and the term names."""
+    columns = list(spec.features) + ([spec.target] if with_target else [])
+    data = df[columns].apply(pd.to_numeric, errors="coerce")
+    terms = ["intercept"]
+    for feature in spec.features:
+        if spec.log_gni and feature == GNI_COLUMN:
+            data[feature] = np.log(data[feature].where(data[feature] > 0))
+            terms.append(f"log({feature})")
+        else:
+            terms.append(feature)
+    return data, terms
+
+
+def _regressors(data: pd.DataFrame, spec: RegressionSpec) -> np.ndarray:
+    """The design matrix, with intercept, of complete model rows."""
+    return np.column_stack(
+        [np.ones(len(data)), data[list(spec.features)].to_numpy(float)]
+    )
+
+
+def design_matrix(
+    df: pd.DataFrame, spec: RegressionSpec, with_target: bool = True
+) -> tuple[np.ndarray, np.ndarray | None, list[str]]:
+    """Build the design matrix (with intercept) and the target vector.
+
+    Rows with missing values in any used column are dropped.
+
+    Args:
+        df (pd.DataFrame): the cleaned annex dataframe
+        spec (RegressionSpec): the model specification
+        with_target (bool, optional): also return the target vector.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray | None, list[str]]: X, y and term names
+    """
+    data, terms = _model_data(df, spec, with_target)
+    data = data.dropna()
+    X = _regressors(data, spec)
+    y = data[spec.target].to_numpy(float) if with_target else None
+    return X, y, terms
+
+
+def _solve_batch(
+    X: np.ndarray, y: np.ndarray, weights: np.ndarray | None = None
+) -> np.ndarray:
+    """Solve a stack of (weighted) least-squares problems at once.
+
+    Args:
+        X (np.ndarray): design matrices of shape (batch, n, p)
+        y (np.ndarray): targets of shape (batch, n)
+        weights (np.ndarray | None, optional): weights of shape (batch, n)
+
+    Returns:
+        np.ndarray: coefficients of shape (batch, p)
+    """
+    if weights is not None:
+        root = np.sqrt(weights)
+        X = X * root[..., None]
+        y = y * root
+    # pinv keeps rank-deficient resamples from failing the whole batch
+    return np.einsum("bpn,bn->bp", np.linalg.pinv(X), y)
+
+
+def _fit_batch(X: np.ndarray, y: np.ndarray, method: str) -> np.ndarray:
+    """Fit OLS or Huber (IRLS) coefficients for a batch of problems."""
+    coef = _solve_batch(X, y)
+    if method == "ols":
+        return coef
+    for _ in range(HUBER_MAX_ITER):
+        residuals = y - np.einsum("bnp,bp->bn", X, coef)
+        # robust scale: median absolute deviation per problem
+        mad = np.median(
+            np.abs(residuals - np.median(residuals, axis=1, keepdims=True)),
+            axis=1,
+            keepdims=True,
+        )
+        scale = np.maximum(mad / 0.6745, np.finfo(float).eps)
+        u = np.abs(residuals / scale)
+        weights = np.where(u <= HUBER_K, 1.0, HUBER_K / np.maximum(u, 1e-12))
+        new_coef = _solve_batch(X, y, weights)
+        converged = np.max(np.abs(new_coef - coef)) < 1e-8
+        coef = new_coef
+        if converged:
+            break
+    return coef
+
+
+def _bootstrap_batch(
+    X: np.ndarray,
+    y: np.ndarray,
+    method: str,
+    size: int,
+    seed: np.random.SeedSequence,
+) -> np.ndarray:
+    """Resample rows `size` times and fit all replicates as one batch."""
+    rng = np.random.default_rng(seed)
+    idx = rng.integers(0, len(y), size=(size, len(y)))
+    return _fit_batch(X[idx], y[idx], method)
+
+
+def _bootstrap_pool(n_jobs: int) -> ProcessPoolExecutor:
+    """The process pool shared by all fits, created on first use.
+
+    The pool is only replaced when the number of workers changes.
+    """
+    global _pool, _pool_workers
+    with _lock:
+        if _pool is None or _pool_workers != n_jobs:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            # spawn: forking a multi-threaded streamlit server is unsafe
+            _pool = ProcessPoolExecutor(
+                max_workers=n_jobs, mp_context=get_context("spawn")
+            )
+            _pool_workers = n_jobs
+        return _pool
+
+
+def fit_regression(
+    df: pd.DataFrame,
+    spec: RegressionSpec,
+    n_boot: int = 1000,
+    seed: int = 0,
+    n_jobs: int = 1,
+) -> RegressionResult:
+    """Fit a regression and its bootstrap distribution.
+
+    Replicates are drawn in batches of BOOT_BATCH; every batch is one
+    vectorized NumPy solve over the stacked resampled design matrices.
+    With n_jobs > 1 the batches are spread over a process pool, shared by
+    all fits, which pays off for large panels. Results do not depend on n_jobs.
+
+    Args:
+        df (pd.DataFrame): the cleaned annex dataframe
+        spec (RegressionSpec): the model specification
+        n_boot (int, optional): number of bootstrap replicates.
+        seed (int, optional): seed of the resampling.
+        n_jobs (int, optional): number of worker processes.
+
+    Returns:
+        RegressionResult: the fitted model
+    """
+    if spec.method not in METHODS:
+        raise ValueError(f"unknown regression method: {spec.method}")
+    X, y, terms = design_matrix(df, spec)
+    if len(y) <= X.shape[1]:
+        raise ValueError(
+            f"not enough complete rows ({len(y)}) to fit {len(terms)} terms"
+        )
+
+    coef = _fit_batch(X[None], y[None], spec.method)[0]
+    residuals = y - X @ coef
+    r_squared = 1 - residuals @ residuals / np.sum((y - y.mean()) ** 2)
+
+    sizes = [BOOT_BATCH] * (n_boot // BOOT_BATCH)
+    if n_boot % BOOT_BATCH:
+        sizes.append(n_boot % BOOT_BATCH)
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    args = [(X, y, spec.method, size, s) for size, s in zip(sizes, seeds)]
+    if n_jobs > 1 and len(args) > 1:
+        pool = _bootstrap_pool(n_jobs)
+        batches = list(pool.map(_bootstrap_batch, *zip(*args)))
+    else:
+        batches = [_bootstrap_batch(*a) for a in args]
+    draws = np.concatenate(batches) if batches else np.empty((0, len(coef)))
+
+    return RegressionResult(
+        spec=spec,
+        terms=terms,
+        coef=coef,
+        r_squared=float(r_squared),
+        n_obs=len(y),
+        draws=draws,
+    )
+
+
+@datasets.graph.node("hdi_clean", params=("spec", "n_boot", "seed"))
+def regression_fit(
+    df: pd.DataFrame,
+    spec: RegressionSpec,
+    n_boot: int = 1000,
+    seed: int = 0,
+) -> RegressionResult:
+    """The regression of a spec on the cleaned HDI table."""
+    # the worker count does not change the result, so it is no parameter
+    n_jobs = int(get_setting("regression_workers", "") or 1)
+    return fit_regression(df, spec, n_boot=n_boot, seed=seed, n_jobs=n_jobs)
+
+
+def cached_fit_regression(
+    sources: Sources,
+    spec: RegressionSpec,
+    n_boot: int = 1000,
+    seed: int = 0,
+) -> RegressionResult:
+    """Fit a regression, once per (dataset, model spec, bootstrap setup).
+
+    The confidence level is applied afterwards by RegressionResult.summary,
+    so changing it never triggers a refit. The bootstrap batches run in
+    `regression_workers` processes.
+
+    Args:
+        sources (Sources): the annex sources, with the HDI sheet
+        spec (RegressionSpec): the model specification
+        n_boot (int, optional): number of bootstrap replicates.
+        seed (int, optional): seed of the resampling.
+
+    Returns:
+        RegressionResult: the fitted model
+    """
+    return datasets.get(
+        "regression_fit", sources, spec=spec, n_boot=n_boot, seed=seed
+    )
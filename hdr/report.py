@@ -0,0 +1,245 @@
+"""Static small-multiples report of the indicator distributions.
+
+Bins, KDE and quartiles of every column are computed once with NumPy and
+reused by every panel that shows the column, and all columns share a few
+figures instead of one figure per column and plot type.
+"""
+
+import math
+import os
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from hdr.lazy import lazy_import
+
+plt = lazy_import("matplotlib.pyplot")
+
+# above this many rows the scatter cells of the pair grid become hexbins
+HEXBIN_MIN_ROWS = 500
+# number of points the KDE is evaluated on
+KDE_POINTS = 256
+# panels per row of the small-multiples figures
+GRID_COLUMNS = 3
+
+
+@dataclass
+class ColumnStats:
+    """Histogram, KDE and box statistics of one column."""
+
+    name: str
+    values: np.ndarray
+    edges: np.ndarray
+    counts: np.ndarray
+    kde_x: np.ndarray
+    kde_y: np.ndarray
+    box: dict
+
+    @property
+    def kde_counts(self) -> np.ndarray:
+        """The KDE scaled to the histogram counts."""
+        return self.kde_y * len(self.values) * np.diff(self.edges).mean()
+
+
+def _kde(values: np.ndarray, grid: np.ndarray) -> np.ndarray:
+    """Gaussian KDE (Scott's bandwidth) on an even grid, by binning.
+
+    The values are binned on the grid and the bin counts are convolved with
+    the kernel, so the cost grows with the grid size, not with the number of
+    values times the grid size.
+    """
+    n = len(values)
+    bandwidth = values.std(ddof=1) * n ** (-1 / 5) if n > 1 else 0.0
+    step = grid[1] - grid[0]
+    if not bandwidth or not step:
+        return np.zeros_like(grid)
+    counts, _ = np.histogram(
+        values, bins=len(grid), range=(grid[0] - step / 2, grid[-1] + step / 2)
+    )
+    # the kernel must not be longer than the grid for mode="same"
+    half = min(int(np.ceil(4 * bandwidth / step)), (len(grid) - 1) // 2)
+    offsets = np.arange(-half, half + 1) * step
+    kernel = np.exp(-0.5 * (offsets / bandwidth) ** 2)
+    kernel /= bandwidth * np.sqrt(2 * np.pi)
+    return np.convolve(counts, kernel, mode="same") / n
+
+
+def column_stats(series: pd.Series, bins: str | int = "auto") -> ColumnStats:
+    """Compute everything the report draws for one column.
+
+    Args:
+        series (pd.Series): the column
+        bins (str | int, optional): np.histogram_bin_edges bins argument.
+
+    Returns:
+        ColumnStats: the histogram, KDE and box statistics
+    """
+    values = pd.to_numeric(series, errors="coerce").to_numpy(dtype=float)
+    values = values[np.isfinite(values)]
+    edges = np.histogram_bin_edges(values, bins=bins)
+    counts, _ = np.histogram(values, bins=edges)
+    pad = (edges[-1] - edges[0]) * 0.1
+    kde_x = np.linspace(edges[0] - pad, edges[-1] + pad, KDE_POINTS)
+
+    # the same 1.5 IQR rule as detect_outliers_iqr
+    q1, median, q3 = np.percentile(values, [25, 50, 75])
+    low, high = q1 - 1.5 * (q3 - q1), q3 + 1.5 * (q3 - q1)
+    inside = values[(values >= low) & (values <= high)]
+    box = {
+        "label": series.name,
+        "q1": q1,
+        "med": median,
+        "q3": q3,
+        "whislo": inside.min() if len(inside) else q1,
+        "whishi": inside.max() if len(inside) else q3,
+        "fliers": values[(values < low) | (values > high)],
+    }
+    return ColumnStats(
+        name=str(series.name),
+        values=values,
+        edges=edges,
+        counts=counts,
+        kde_x=kde_x,
+        kde_y=_kde(values, kde_x),
+        box=box,
+    )
+
+
+def _grid(n_panels: int, size: float = 3.5):
+    n_rows = math.ceil(n_panels / GRID_COLUMNS)
+    n_cols = min(n_panels, GRID_COLUMNS)
+    fig, axes = plt.subplots(
+        n_rows,
+        n_cols,
+        figsize=(size * n_cols, size * 0.8 * n_rows),
+        squeeze=False,
+    )
+    for ax in axes.ravel()[n_panels:]:
+        ax.set_visible(False)
+    return fig, axes.ravel()
+
+
+def _draw_histogram(ax, stats: ColumnStats) -> None:
+    ax.stairs(stats.counts, stats.edges, fill=True, alpha=0.6)
+    ax.plot(stats.kde_x, stats.kde_counts, linewidth=1)
+
+
+def _save(fig, path: str) -> str:
+    fig.tight_layout()
+    fig.savefig(path)
+    plt.close(fig)
+    return path
+
+
+def distributions_figure(stats: list[ColumnStats], path: str) -> str:
+    """Histograms with KDE of all columns in one figure."""
+    fig, axes = _grid(len(stats))
+    for ax, column in zip(axes, stats):
+        _draw_histogram(ax, column)
+        ax.set_title(column.name, fontsize=9)
+    fig.suptitle("Distributions")
+    return _save(fig, path)
+
+
+def boxplots_figure(stats: list[ColumnStats], path: str) -> str:
+    """Boxplots of all columns in one figure, from the precomputed stats."""
+    fig, axes = _grid(len(stats))
+    for ax, column in zip(axes, stats):
+        ax.bxp([column.box], orientation="horizontal", showfliers=True)
+        ax.set_yticks([])
+        ax.set_title(column.name, fontsize=9)
+    fig.suptitle("Boxplots")
+    return _save(fig, path)
+
+
+def pairs_figure(
+    df: pd.DataFrame,
+    stats: list[ColumnStats],
+    path: str,
+    hexbin_min_rows: int = HEXBIN_MIN_ROWS,
+) -> str:
+    """Lower-triangle pair grid; the diagonal reuses the histograms.
+
+    Args:
+        df (pd.DataFrame): the data
+        stats (list[ColumnStats]): stats of the columns of the grid
+        path (str): output file
+        hexbin_min_rows (int, optional): draw hexbin densities instead of
+            scatter points from this many rows on.
+
+    Returns:
+        str: the output file
+    """
+    k = len(stats)
+    fig, axes = plt.subplots(k, k, figsize=(2 * k, 2 * k), squeeze=False)
+    data = df[[column.name for column in stats]].apply(
+        pd.to_numeric, errors="coerce"
+    )
+    hexbin = len(data) >= hexbin_min_rows
+    for i, row in enumerate(stats):
+        for j, col in enumerate(stats):
+            ax = axes[i, j]
+            if j > i:
+                ax.set_visible(False)
+                continue
+            if i == j:
+                _draw_histogram(ax, row)
+            else:
+                pair = data[[col.name, row.name]].dropna().to_numpy()
+                if hexbin:
+                    ax.hexbin(
+                        pair[:, 0],
+                        pair[:, 1],
+                        gridsize=25,
+                        mincnt=1,
+                        cmap="Blues",
+                        rasterized=True,
+                    )
+                else:
+                    ax.scatter(pair[:, 0], pair[:, 1], s=4, rasterized=True)
+            ax.tick_params(labelsize=6)
+            if i == k - 1:
+                ax.set_xlabel(col.name, fontsize=7)
+            if j == 0:
+                ax.set_ylabel(row.name, fontsize=7)
+    return _save(fig, path)
+
+
+def write_report(
+    df: pd.DataFrame,
+    columns: list[str],
+    out_dir: str,
+    pair_columns: list[str] | None = None,
+    fmt: str = "png",
+) -> list[str]:
+    """Draw the distributions, boxplots and pair grid of a frame.
+
+    Args:
+        df (pd.DataFrame): the data
+        columns (list[str]): columns of the distribution and box figures
+        out_dir (str): directory of the figures
+        pair_columns (list[str] | None, optional): columns of the pair grid.
+            defaults to columns.
+        fmt (str, optional): image format. Defaults to "png".
+
+    Returns:
+        list[str]: the written files
+    """
+    pair_columns = list(columns if pair_columns is None else pair_columns)
+    stats = {
+        col: column_stats(df[col])
+        for col in dict.fromkeys([*columns, *pair_columns])
+    }
+    selected = [stats[col] for col in columns]
+    return [
+        distributions_figure(
+            selected, os.path.join(out_dir, f"Distributions.{fmt}")
+        ),
+        boxplots_figure(selected, os.path.join(out_dir, f"Boxplots.{fmt}")),
+        pairs_figure(
+            df,
+            [stats[col] for col in pair_columns],
+            os.path.join(out_dir, f"Pairplot.{fmt}"),
+        ),
+    ]
@@ -0,0 +1,269 @@
+"""Column mappings of the annex sheets, compiled once per header layout.
+
+A sheet's header layout is fingerprinted by its column names in order. The
+first read of a layout resolves every expected column by name into a
+CompiledMapping (positions, target names and the numeric columns); every
+later read of a sheet with the same header reuses it and is a plain
+positional selection. A header that is missing an expected column or has
+one the schema does not know raises a SchemaDriftError before any data is
+processed.
+"""
+
+import hashlib
+import re
+import threading
+from dataclasses import dataclass, field
+
+import pandas as pd
+
+# spacer columns ("Unnamed: 3") and footnote letter columns ("a") carry no
+# data in the annex tables
+IGNORED_COLUMNS = r"^(unnamed: \d+|[a-z])$"
+
+
+@dataclass(frozen=True)
+class Column:
+    """An expected column of a sheet."""
+
+    target: str
+    aliases: tuple[str, ...]
+    numeric: bool = False
+    required: bool = True
+
+
+@dataclass(frozen=True)
+class SheetSchema:
+    """The expected columns of one sheet, in output order."""
+
+    name: str
+    columns: tuple[Column, ...]
+    ignored: str = IGNORED_COLUMNS
+
+
+@dataclass(frozen=True)
+class CompiledMapping:
+    """The resolved columns of one header layout of a sheet."""
+
+    schema: str
+    layout: str
+    positions: tuple[int, ...]
+    names: tuple[str, ...]
+    numeric: tuple[str, ...]
+    rename: dict[str, str] = field(hash=False)
+
+    def apply(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Select and rename the mapped columns of a sheet of this layout."""
+        frame = df.iloc[:, list(self.positions)]
+        frame.columns = list(self.names)
+        return frame
+
+
+@dataclass
+class DriftReport:
+    """How a header differs from what the schema expects."""
+
+    schema: str
+    layout: str
+    missing: list[str]
+    unexpected: list[str]
+    ambiguous: list[str]
+
+    def __str__(self) -> str:
+        lines = [
+            f"the {self.schema} sheet has an unknown layout {self.layout}"
+        ]
+        for label, names in (
+            ("missing columns", self.missing),
+            ("unexpected columns", self.unexpected),
+            ("columns matched more than once", self.ambiguous),
+        ):
+            if names:
+                lines.append(f"{label}: {', '.join(map(repr, names))}")
+        return "\n".join(lines)
+
+
+class SchemaDriftError(ValueError):
+    """The header of a sheet does not match its schema."""
+
+    def __init__(self, report: DriftReport):
+        super().__init__(str(report))
+        self.report = report
+
+
+def normalize(name) -> str:
+    """Header name compared case- and whitespace-insensitively."""
+    return " ".join(str(name).split()).casefold()
+
+
+def layout_fingerprint(columns) -> str:
+    """Hash of the column names of a sheet, in order."""
+    header = "\x1f".join(str(name) for name in columns)
+    return hashlib.blake2b(header.encode(), digest_size=8).hexdigest()
+
+
+_compiled: dict[tuple[str, str], CompiledMapping] = {}
+_lock = threading.Lock()
+
+
+def _resolve(schema: SheetSchema, columns: list[str]) -> CompiledMapping:
+    layout = layout_fingerprint(columns)
+    headers = [normalize(name) for name in columns]
+    positions, names, numeric, rename = [], [], [], {}
+    missing, ambiguous = [], []
+    for column in schema.columns:
+        aliases = {normalize(alias) for alias in column.aliases}
+        found = [i for i, header in enumerate(headers) if header in aliases]
+        if len(found) > 1:
+            ambiguous.append(column.target)
+        elif not found:
+            if column.required:
+                missing.append(column.target)
+            continue
+        position = found[0]
+        positions.append(position)
+        names.append(column.target)
+        rename[columns[position]] = column.target
+        if column.numeric:
+            numeric.append(column.target)
+    ignored = re.compile(schema.ignored)
+    unexpected = [
+        str(columns[i])
+        for i, header in enumerate(headers)
+        if i not in positions and not ignored.match(header)
+    ]
+    if missing or unexpected or ambiguous:
+        raise SchemaDriftError(
+            DriftReport(schema.name, layout, missing, unexpected, ambiguous)
+        )
+    return CompiledMapping(
+        schema=schema.name,
+        layout=layout,
+        positions=tuple(positions),
+        names=tuple(names),
+        numeric=tuple(numeric),
+        rename=rename,
+    )
+
+
+def compile_mapping(schema: SheetSchema, columns) -> CompiledMapping:
+    """The mapping of a header layout, compiled on its first read.
+
+    Args:
+        schema (SheetSchema): the expected columns
+        columns: the header of the sheet, e.g. df.columns
+
+    Returns:
+        CompiledMapping: positions, target names and numeric columns
+
+    Raises:
+        SchemaDriftError: if a required column is missing, a column is
+            matched twice or the header has a column the schema does not
+            know. the error carries the DriftReport.
+    """
+    columns = list(columns)
+    key = (schema.name, layout_fingerprint(columns))
+    with _lock:
+        mapping = _compiled.get(key)
+    if mapping is None:
+        mapping = _resolve(schema, columns)
+        with _lock:
+            _compiled[key] = mapping
+    return mapping
+
+
+def known_layouts() -> dict[str, list[str]]:
+    """The layouts compiled so far in this process, per schema."""
+    with _lock:
+        layouts: dict[str, list[str]] = {}
+        for name, layout in _compiled:
+            layouts.setdefault(name, []).append(layout)
+        return layouts
+
+
+HDI_SCHEMA = SheetSchema(
+    name="HDI",
+    columns=(
+        Column("HDI rank", ("HDI rank",)),
+        Column("Country", ("Country",)),
+        Column("HDI", ("Human Development Index (HDI)",), numeric=True),
+        Column("Life expectancy at birth", ("Life expectancy at birth",)),
+        Column(
+            "Expected years of schooling",
+            ("Expected years of schooling",),
+            numeric=True,
+        ),
+        Column(
+            "Mean years of schooling",
+            ("Mean years of schooling",),
+            numeric=True,
+        ),
+        Column(
+            "Gross national income (GNI) per capita",
+            ("Gross national income (GNI) per capita",),
+            numeric=True,
+        ),
+        Column(
+            "GNI per capita rank minus HDI rank",
+            ("GNI per capita rank minus HDI rank",),
+            numeric=True,
+        ),
+        # the table repeats the HDI rank as its last column
+        Column("HDI_rank", ("HDI rank.1",), numeric=True),
+    ),
+)
+
+TRENDS_SCHEMA = SheetSchema(
+    name="HDI trends",
+    columns=(
+        Column("rank based on hdi", ("HDI rank",)),
+        Column("country", ("Country",)),
+        *(
+            Column(f"hdi_{year}", (year,), numeric=True)
+            for year in (
+                "1990",
+                "2000",
+                "2010",
+                "2015",
+                "2019",
+                "2020",
+                "2021",
+                "2022",
+            )
+        ),
+        Column("change in hdi rank 2015-2022", ("2015-2022",), numeric=True),
+        *(
+            Column(f"avg hdi growth (%) {period}", (period,), numeric=True)
+            for period in (
+                "1990-2000",
+                "2000-2010",
+                "2010-2022",
+                "1990-2022",
+            )
+        ),
+    ),
+)
+
+SCHEMAS = {schema.name: schema for schema in (HDI_SCHEMA, TRENDS_SCHEMA)}
+
+
+def check_layouts(sheets: dict[str, pd.DataFrame]) -> list[DriftReport]:
+    """Check the header of every sheet that has a schema.
+
+    Only the headers are read, so this is cheap enough to run on every new
+    workbook before it is processed.
+
+    Args:
+        sheets (dict[str, pd.DataFrame]): the sheets of a workbook
+
+    Returns:
+        list[DriftReport]: a report per drifted sheet; empty if all match
+    """
+    reports = []
+    for name, schema in SCHEMAS.items():
+        if name not in sheets:
+            continue
+        try:
+            compile_mapping(schema, sheets[name].columns)
+        except SchemaDriftError as error:
+            reports.append(error.report)
+    return reports
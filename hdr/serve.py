@@ -0,0 +1,25 @@
+"""Run the dashboard with the cache prewarm hook started at server start.
+
+usage: python -m hdr.serve [streamlit run options]
+e.g.   python -m hdr.serve --server.port 8888
+"""
+
+import sys
+
+from hdr.prewarm import start_prewarm
+from hdr.watcher import start_watcher
+
+
+def main(argv: list[str] | None = None) -> None:
+    from streamlit.web import cli as stcli
+
+    # the workbooks are parsed in the loader pool while the server starts
+    start_prewarm()
+    start_watcher()
+    args = sys.argv[1:] if argv is None else argv
+    sys.argv = ["streamlit", "run", "dashboard_intro.py", *args]
+    sys.exit(stcli.main())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+"""Workbooks shared by several dashboard server processes.
+
+One process publishes the parsed sheets of a workbook as Arrow IPC files,
+by default in /dev/shm (POSIX shared memory); every replica memory-maps
+them read-only instead of parsing and holding its own copy. Versions are
+keyed by the content fingerprint and the CURRENT file names the latest one,
+so replicas switch to a new workbook in one step.
+
+Opt-in with `shared_data=true` in config.env (`shared_dir` to move the
+files). To publish a workbook from a loader process:
+
+usage: python -m hdr.shared [workbook]
+"""
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+from functools import lru_cache
+from pathlib import Path
+
+import pandas as pd
+
+from hdr.config import get_flag, get_setting
+from hdr.schema import SchemaDriftError, check_layouts
+
+CURRENT_FILE = "CURRENT"
+MANIFEST_FILE = "manifest.json"
+# published versions kept on disk, the current one included
+KEEP_VERSIONS = 3
+
+
+def shared_dir() -> Path | None:
+    """Directory of the published workbooks, None if sharing is off."""
+    if not get_flag("shared_data"):
+        return None
+    default = "/dev/shm"
+    if not os.path.isdir(default):
+        default = tempfile.gettempdir()
+    return Path(get_setting("shared_dir", "") or default) / "hdr_shared"
+
+
+def _to_arrow(df: pd.DataFrame):
+    """Convert a sheet to an Arrow table that maps back without copying.
+
+    Numeric columns keep NaN as a value rather than a null, so readers can
+    use the mapped buffers as they are. Object columns mixing numbers and
+    text (e.g. ".." for missing) are stored as text.
+    """
+    import pyarrow as pa
+
+    arrays = []
+    for _, values in df.items():
+        if pd.api.types.is_numeric_dtype(values.dtype):
+            arrays.append(pa.array(values.to_numpy(), from_pandas=False))
+            continue
+        try:
+            arrays.append(pa.array(values, from_pandas=True))
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            arrays.append(
+                pa.array(values.where(values.isna(), values.astype(str)))
+            )
+    return pa.table(arrays, names=[str(col) for col in df.columns])
+
+
+def _write_current(root: Path, fingerprint: str) -> None:
+    """Point CURRENT to a version; os.replace makes the switch atomic."""
+    fd, tmp = tempfile.mkstemp(dir=root, prefix=".CURRENT-")
+    with os.fdopen(fd, "w") as file:
+        file.write(fingerprint)
+    os.chmod(tmp, 0o644)
+    os.replace(tmp, root / CURRENT_FILE)
+
+
+def _prune(root: Path, keep: str) -> None:
+    """Remove the oldest versions. replicas that still map them keep their
+    mapping: unlinking a file does not invalidate it."""
+    versions = sorted(
+        (path for path in root.iterdir() if (path / MANIFEST_FILE).exists()),
+        key=lambda path: path.stat().st_mtime,
+        reverse=True,
+    )
+    for path in versions[KEEP_VERSIONS:]:
+        if path.name != keep:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def publish(fingerprint: str, sheets: dict[str, pd.DataFrame]) -> bool:
+    """Publish the sheets of a workbook and make it the current version.
+
+    A version is written to a temporary directory and renamed into place,
+    so replicas never see a partial one; it is only written once per
+    content. Only the default workbook is published: every replica and
+    session that did not upload a workbook switches to it.
+
+    Args:
+        fingerprint (str): content hash of the workbook
+        sheets (dict[str, pd.DataFrame]): the parsed sheets by name
+
+    Returns:
+        bool: True if the workbook was published, False if sharing is off
+
+    Raises:
+        SchemaDriftError: if a sheet does not match its schema; nothing is
+            published then.
+    """
+    import pyarrow.ipc as ipc
+
+    root = shared_dir()
+    if root is None:
+        return False
+    # a drifted header would break the pages of every replica
+    drift = check_layouts(sheets)
+    if drift:
+        raise SchemaDriftError(drift[0])
+    root.mkdir(parents=True, exist_ok=True)
+    version = root / fingerprint
+    if not version.exists():
+        tmp = Path(tempfile.mkdtemp(dir=root, prefix=".tmp-"))
+        # replicas may run as other users
+        tmp.chmod(0o755)
+        manifest = {}
+        for i, (name, df) in enumerate(sheets.items()):
+            table = _to_arrow(df)
+            with ipc.new_file(tmp / f"{i}.arrow", table.schema) as writer:
+                writer.write_table(table)
+            manifest[name] = f"{i}.arrow"
+        (tmp / MANIFEST_FILE).write_text(json.dumps(manifest))
+        try:
+            os.rename(tmp, version)
+        except OSError:
+            # another process published the same workbook first
+            shutil.rmtree(tmp, ignore_errors=True)
+    _write_current(root, fingerprint)
+    _prune(root, keep=fingerprint)
+    return True
+
+
+def current_version() -> str | None:
+    """Fingerprint of the current published workbook, if there is one."""
+    root = shared_dir()
+    try:
+        return (root / CURRENT_FILE).read_text().strip() or None
+    except (TypeError, OSError):
+        return None
+
+
+def is_published(fingerprint: str) -> bool:
+    """Whether a workbook is available to attach to."""
+    root = shared_dir()
+    return root is not None and (root / fingerprint / MANIFEST_FILE).exists()
+
+
+@lru_cache(maxsize=KEEP_VERSIONS)
+def attach(fingerprint: str) -> dict[str, pd.DataFrame]:
+    """Map a published workbook into this process, read-only.
+
+    The frames are built on the mapped Arrow buffers: numeric columns are
+    views of the shared pages, not copies. Like the sheets of the loader
+    cache, the frames are shared and must not be modified.
+
+    Args:
+        fingerprint (str): content hash of the published workbook
+
+    Returns:
+        dict[str, pd.DataFrame]: the sheets by name
+    """
+    import pyarrow as pa
+    import pyarrow.ipc as ipc
+
+    version = shared_dir() / fingerprint
+    manifest = json.loads((version / MANIFEST_FILE).read_text())
+    sheets = {}
+    for name, file_name in manifest.items():
+        source = pa.memory_map(str(version / file_name), "r")
+        table = ipc.open_file(source).read_all()
+        sheets[name] = table.to_pandas(split_blocks=True)
+    return sheets
+
+
+def main(argv: list[str] | None = None) -> None:
+    from hdr.config import annex_path
+    from hdr.fingerprints import fingerprint_file
+    from hdr.workers import read_excel
+
+    args = sys.argv[1:] if argv is None else argv
+    path = args[0] if args else annex_path()
+    fingerprint = fingerprint_file(path)
+    try:
+        published = publish(fingerprint, read_excel(path))
+    except SchemaDriftError as error:
+        sys.exit(f"not published: {error}")
+    if not published:
+        sys.exit("shared data is off: set shared_data=true in config.env")
+    print(f"published {path} as version {fingerprint}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from hdr import datasets
+from hdr.datasets import Sources
+from hdr.trends import interpolate_years
+
+METRICS = {
+    "euclidean": "Euclidean (RMS difference)",
+    "dtw": "DTW-lite (time-warped)",
+    "correlation": "Correlation (shape only)",
+}
+
+# Sakoe-Chiba band of the DTW alignment, in years
+DTW_WINDOW = 3
+
+
+@dataclass
+class SimilarityIndex:
+    """Precomputed pairwise distances between country HDI trajectories."""
+
+    countries: np.ndarray
+    distances: dict[str, np.ndarray]
+
+    def neighbours(
+        self, country: str, k: int = 5, metric: str = "euclidean"
+    ) -> pd.DataFrame:
+        """Find the k countries whose trajectory is closest to a country.
+
+        Args:
+            country (str): the reference country
+            k (int, optional): number of neighbours. Defaults to 5.
+            metric (str, optional): one of METRICS. Defaults to "euclidean".
+
+        Returns:
+            pd.DataFrame: the neighbours and their distance, closest first
+        """
+        matches = np.flatnonzero(self.countries == country)
+        if not len(matches):
+            raise KeyError(f"unknown country: {country}")
+        row = self.distances[metric][matches[0]].copy()
+        row[matches[0]] = np.nan
+        candidates = np.flatnonzero(~np.isnan(row))
+        k = min(k, len(candidates))
+        if k == 0:
+            return pd.DataFrame(columns=["country", "distance"])
+        nearest = candidates[np.argpartition(row[candidates], k - 1)[:k]]
+        nearest = nearest[np.argsort(row[nearest])]
+        return pd.DataFrame(
+            {"country": self.countries[nearest], "distance": row[nearest]}
+        )
+
+
+def _euclidean(values: np.ndarray, mask: np.ndarray) -> np.ndarray:
+    """RMS difference of all pairs over the years both have data for."""
+    x = np.where(mask, values, 0.0)
+    m = mask.astype(float)
+    sq = x**2
+    # sum over common years of (x_a - x_b)^2, expanded into matrix products
+    total = sq @ m.T + m @ sq.T - 2 * x @ x.T
+    counts = m @ m.T
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.sqrt(np.maximum(total, 0) / counts)
+
+
+def _correlation(values: np.ndarray, mask: np.ndarray) -> np.ndarray:
+    """1 - Pearson correlation of all pairs over their common years."""
+    x = np.where(mask, values, 0.0)
+    m = mask.astype(float)
+    n = m @ m.T
+    sx, sy = x @ m.T, m @ x.T
+    sxx, syy = (x**2) @ m.T, m @ (x**2).T
+    sxy = x @ x.T
+    with np.errstate(invalid="ignore", divide="ignore"):
+        corr = (n * sxy - sx * sy) / np.sqrt(
+            (n * sxx - sx**2) * (n * syy - sy**2)
+        )
+    return 1 - np.clip(corr, -1, 1)
+
+
+def _dtw(values: np.ndarray, window: int) -> np.ndarray:
+    """Banded DTW distance of all pairs, vectorized over the pairs.
+
+    The dynamic program walks the (year, year) cells inside the band; each
+    cell is one (countries x countries) array operation.
+    """
+    n_years = values.shape[1]
+    previous: dict[int, np.ndarray] = {}
+    for i in range(n_years):
+        current: dict[int, np.ndarray] = {}
+        for j in range(max(0, i - window), min(n_years, i + window + 1)):
+            cost = np.abs(values[:, i, None] - values[None, :, j])
+            steps = [
+                step
+                for step in (
+                    previous.get(j),
+                    previous.get(j - 1),
+                    current.get(j - 1),
+                )
+                if step is not None
+            ]
+            current[j] = cost + np.minimum.reduce(steps) if steps else cost
+        previous = current
+    return previous[n_years - 1] / n_years
+
+
+def build_index(
+    long_df: pd.DataFrame, metrics: tuple[str, ...] = tuple(METRICS)
+) -> SimilarityIndex:
+    """Build the similarity index from the long-format HDI trends.
+
+    Args:
+        long_df (pd.DataFrame): output of transform_to_long_format
+        metrics (tuple[str, ...], optional): the METRICS to compute.
+            Defaults to all.
+
+    Returns:
+        SimilarityIndex: the index with the pairwise distance matrices
+    """
+    matrix = long_df.pivot_table(
+        index="country", columns="year", values="hdi", aggfunc="first"
+    )
+    years = matrix.columns.to_numpy(dtype=int)
+    grid = np.arange(years.min(), years.max() + 1)
+    values = interpolate_years(matrix.to_numpy(dtype=float), years, grid)
+    mask = ~np.isnan(values)
+
+    distances = {}
+    if "euclidean" in metrics:
+        distances["euclidean"] = _euclidean(values, mask)
+    if "dtw" in metrics:
+        # DTW needs complete series: hold the first/last value constant
+        filled = pd.DataFrame(values).ffill(axis=1).bfill(axis=1).to_numpy()
+        dtw = _dtw(np.nan_to_num(filled), DTW_WINDOW)
+        dtw[~mask.any(axis=1)] = np.nan
+        dtw[:, ~mask.any(axis=1)] = np.nan
+        distances["dtw"] = dtw
+    if "correlation" in metrics:
+        distances["correlation"] = _correlation(values, mask)
+    return SimilarityIndex(
+        countries=matrix.index.to_numpy(), distances=distances
+    )
+
+
+@datasets.graph.node("trends_long", params=("metric",))
+def similarity_index(
+    long_df: pd.DataFrame, metric: str = "euclidean"
+) -> SimilarityIndex:
+    """The similarity index of the HDI trends for one metric."""
+    return build_index(long_df, metrics=(metric,))
+
+
+def cached_index(
+    sources: Sources, metric: str = "euclidean"
+) -> SimilarityIndex:
+    """build_index of one metric, computed once per trends content.
+
+    Args:
+        sources (Sources): the annex sources, with the HDI trends sheet
+        metric (str, optional): one of METRICS. Defaults to "euclidean".
+
+    Returns:
+        SimilarityIndex: the index with the distances of the metric
+    """
+    return datasets.get("similarity_index", sources, metric=metric)
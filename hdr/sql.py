@@ -0,0 +1,95 @@
+import re
+from pathlib import Path
+
+import pandas as pd
+import streamlit as st
+
+from hdr.store import STORE_DIR, write_store
+
+PARAMETER = re.compile(r"\$([A-Za-z_]\w*)")
+
+
+def _quote(value: str) -> str:
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+@st.cache_resource(max_entries=4, show_spinner="Opening query engine...")
+def _connect(fingerprint: str, _tables: dict[str, Path]):
+    import duckdb
+
+    con = duckdb.connect(":memory:")
+    for name, path in _tables.items():
+        # views, not tables: every query scans the Parquet file, so DuckDB
+        # only reads the columns and row groups the query needs
+        con.execute(
+            f'CREATE VIEW "{name}" AS '
+            f"SELECT * FROM read_parquet({_quote(path.as_posix())})"
+        )
+    # sandbox: queries can read the store of this workbook and nothing
+    # else, not even the stores of other sessions' uploads, and cannot
+    # change that
+    directory = f"{(STORE_DIR / fingerprint).as_posix()}/"
+    con.execute(f"SET allowed_directories=[{_quote(directory)}]")
+    con.execute("SET enable_external_access=false")
+    con.execute("SET lock_configuration=true")
+    return con
+
+
+def connect(fingerprint: str, sheets: dict[str, pd.DataFrame]):
+    """An in-process DuckDB connection over the columnar store of a workbook.
+
+    Every sheet is a view named after the sheet in snake_case (e.g.
+    "hdi_trends"), plus the annual long-format panel "trends_long". The
+    connection is shared by all sessions viewing the same workbook.
+
+    Args:
+        fingerprint (str): content hash of the workbook
+        sheets (dict[str, pd.DataFrame]): the raw sheets by name
+
+    Returns:
+        duckdb.DuckDBPyConnection: the read-only, sandboxed connection
+    """
+    return _connect(fingerprint, write_store(fingerprint, sheets))
+
+
+def query_parameters(sql: str) -> list[str]:
+    """Names of the $name placeholders of a query, in order of appearance."""
+    return list(dict.fromkeys(PARAMETER.findall(sql)))
+
+
+def run_query(con, sql: str, params: dict | None = None) -> pd.DataFrame:
+    """Run a single SELECT statement.
+
+    The result comes back as an Arrow table and is handed to pandas without
+    a row-by-row conversion.
+
+    Args:
+        con (duckdb.DuckDBPyConnection): output of connect
+        sql (str): one SELECT statement with optional $name parameters
+        params (dict | None, optional): the parameter values by name.
+
+    Returns:
+        pd.DataFrame: the query result
+    """
+    import duckdb
+
+    statements = con.extract_statements(sql)
+    if len(statements) != 1:
+        raise ValueError("please enter exactly one statement")
+    if statements[0].type != duckdb.StatementType.SELECT:
+        raise ValueError("only SELECT statements are allowed")
+    # a cursor per query: sessions share the connection, not its results
+    result = con.cursor().execute(sql, params or {}).arrow()
+    if hasattr(result, "read_all"):
+        result = result.read_all()
+    return result.to_pandas()
+
+
+def schema(con) -> pd.DataFrame:
+    """Tables and columns available to queries."""
+    return run_query(
+        con,
+        "SELECT table_name, column_name, data_type "
+        "FROM information_schema.columns "
+        "ORDER BY table_name, ordinal_position",
+    )
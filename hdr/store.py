@@ -0,0 +1,136 @@
+import os
+import re
+import shutil
+import tempfile
+from pathlib import Path
+
+import pandas as pd
+
+from hdr import datasets
+from hdr.coercion import coerce_numeric
+from hdr.schema import SchemaDriftError
+
+STORE_DIR = Path(tempfile.gettempdir()) / "hdr_store"
+TRENDS_SHEET = "HDI trends"
+TRENDS_LONG_TABLE = "trends_long"
+# workbooks whose store and quality profile are kept on disk
+MAX_STORES = 8
+QUALITY_SUFFIX = ".quality"
+
+
+def table_name(name: str) -> str:
+    """snake_case SQL identifier of a sheet or column name.
+
+    Names starting with a digit (e.g. "2015-2022") get a "y" prefix.
+    """
+    name = re.sub(r"[^0-9a-z]+", "_", str(name).strip().lower()).strip("_")
+    if not name or name[0].isdigit():
+        name = f"y{name}"
+    return name
+
+
+def _sanitize_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """Give every column a unique SQL identifier; drop "Unnamed" columns."""
+    df = df.loc[:, ~df.columns.astype(str).str.contains("^Unnamed")]
+    names, seen = [], {}
+    for col in df.columns:
+        name = table_name(col)
+        seen[name] = seen.get(name, 0) + 1
+        names.append(name if seen[name] == 1 else f"{name}_{seen[name]}")
+    return df.set_axis(names, axis=1)
+
+
+def _columnar(df: pd.DataFrame) -> pd.DataFrame:
+    """Give every text column a single type, as Parquet requires.
+
+    Columns where at least half of the values are numbers become numeric
+    (sentinels such as ".." become null, footnote letters are dropped); the
+    others become strings.
+    """
+    df = _sanitize_columns(df)
+    text = df.select_dtypes(include=["object", "string"]).columns
+    coerced = coerce_numeric(df, text)
+    counts = coerced.report
+    non_null = len(df) - counts["missing"]
+    numeric = (counts["numbers"] + counts["parsed"]) * 2 >= non_null
+    columns = {
+        col: (
+            coerced.frame[col]
+            if numeric[col] and non_null[col]
+            else df[col].astype("string")
+        )
+        for col in text
+    }
+    return df.assign(**columns)
+
+
+def evict_stores(keep: Path) -> None:
+    """Mark a store directory as used and remove the least recently used.
+
+    The Parquet store of a workbook and its quality profile
+    (<fingerprint>.quality) are removed together; at most MAX_STORES
+    workbooks are kept, the one of `keep` included.
+
+    Args:
+        keep (Path): the store or quality directory in use
+    """
+    os.utime(keep)
+    used: dict[str, float] = {}
+    for path in STORE_DIR.iterdir():
+        # skip the temporary directories of stores being written
+        if path.name.startswith("."):
+            continue
+        fingerprint = path.name.removesuffix(QUALITY_SUFFIX)
+        try:
+            mtime = path.stat().st_mtime
+        except OSError:
+            # removed by another session
+            continue
+        used[fingerprint] = max(used.get(fingerprint, 0.0), mtime)
+    current = keep.name.removesuffix(QUALITY_SUFFIX)
+    stale = sorted(used, key=used.get, reverse=True)[MAX_STORES:]
+    for fingerprint in stale:
+        if fingerprint != current:
+            for name in (fingerprint, fingerprint + QUALITY_SUFFIX):
+                shutil.rmtree(STORE_DIR / name, ignore_errors=True)
+
+
+def write_store(
+    fingerprint: str, sheets: dict[str, pd.DataFrame]
+) -> dict[str, Path]:
+    """Write the sheets of a workbook to Parquet, once per workbook content.
+
+    The store of a fingerprint is written to a temporary directory and moved
+    into place in one rename, so readers never see a partial store. Only
+    the stores of the MAX_STORES most recently used workbooks are kept.
+
+    Args:
+        fingerprint (str): content hash of the workbook
+        sheets (dict[str, pd.DataFrame]): the raw sheets by name
+
+    Returns:
+        dict[str, Path]: the Parquet file of every table by table name
+    """
+    directory = STORE_DIR / fingerprint
+    if not directory.exists():
+        STORE_DIR.mkdir(parents=True, exist_ok=True)
+        tmp = Path(tempfile.mkdtemp(dir=STORE_DIR, prefix=".tmp-"))
+        tables = {table_name(name): df for name, df in sheets.items()}
+        if TRENDS_SHEET in sheets:
+            # the annual panel of the trends page, from the dataset graph
+            sources = datasets.annex_sources(fingerprint, sheets)
+            try:
+                panel = datasets.get("trends_panel", sources)
+                tables[TRENDS_LONG_TABLE] = panel.to_long()
+            except SchemaDriftError:
+                # the raw sheet can still be queried
+                pass
+        for name, df in tables.items():
+            _columnar(df).to_parquet(tmp / f"{name}.parquet", index=False)
+        try:
+            os.rename(tmp, directory)
+        except OSError:
+            # another session stored the same workbook first
+            shutil.rmtree(tmp, ignore_errors=True)
+    evict_stores(keep=directory)
+    return {path.stem: path for path in sorted(directory.glob("*.parquet"))}
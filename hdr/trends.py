@@ -0,0 +1,170 @@
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+
+@dataclass
+class TrendPanel:
+    """HDI values as a country x year matrix on an annual grid.
+
+    `observed` marks the cells taken from the sheet; the other cells are
+    linearly interpolated between the neighbouring observed years (no
+    extrapolation, so leading and trailing gaps stay NaN).
+    """
+
+    countries: np.ndarray
+    years: np.ndarray
+    values: np.ndarray
+    observed: np.ndarray
+    ranks: np.ndarray
+
+    def year_index(self, year: int) -> int:
+        """Column of a year in the matrix."""
+        index = int(year - self.years[0])
+        if not 0 <= index < len(self.years):
+            raise ValueError(
+                f"year {year} is outside {self.years[0]}-{self.years[-1]}"
+            )
+        return index
+
+    def to_long(self) -> pd.DataFrame:
+        """The panel in the long format of transform_to_long_format."""
+        return pd.DataFrame(
+            {
+                "country": np.repeat(self.countries, len(self.years)),
+                "year": np.tile(self.years, len(self.countries)),
+                "hdi": self.values.ravel(),
+                "interpolated": ~self.observed.ravel(),
+            }
+        )
+
+
+def interpolate_years(
+    values: np.ndarray, years: np.ndarray, grid: np.ndarray
+) -> np.ndarray:
+    """Linearly interpolate every row of a matrix onto a year grid at once.
+
+    Missing values (NaN) inside a row are bridged by the nearest observed
+    years before and after them.
+
+    Args:
+        values (np.ndarray): matrix of shape (countries, len(years))
+        years (np.ndarray): sorted years of the columns, a subset of grid
+        grid (np.ndarray): sorted years of the output columns
+
+    Returns:
+        np.ndarray: matrix of shape (countries, len(grid))
+    """
+    full = np.full((values.shape[0], len(grid)), np.nan)
+    full[:, np.searchsorted(grid, years)] = values
+    valid = ~np.isnan(full)
+    positions = np.arange(len(grid))
+
+    # index of the last observed column at or before each column ...
+    prev = np.maximum.accumulate(np.where(valid, positions, -1), axis=1)
+    # ... and of the first observed column at or after it
+    nxt = np.minimum.accumulate(
+        np.where(valid, positions, len(grid))[:, ::-1], axis=1
+    )[:, ::-1]
+    inside = (prev >= 0) & (nxt < len(grid))
+    prev_c = np.clip(prev, 0, len(grid) - 1)
+    next_c = np.clip(nxt, 0, len(grid) - 1)
+    rows = np.arange(values.shape[0])[:, None]
+    v0, v1 = full[rows, prev_c], full[rows, next_c]
+    t0, t1 = grid[prev_c], grid[next_c]
+    span = np.where(t1 > t0, t1 - t0, 1)
+    result = v0 + (v1 - v0) * (grid - t0) / span
+    return np.where(inside, result, np.nan)
+
+
+def rank_matrix(values: np.ndarray) -> np.ndarray:
+    """Rank the countries in every year (1 = highest HDI, ties share).
+
+    Args:
+        values (np.ndarray): matrix of shape (countries, years)
+
+    Returns:
+        np.ndarray: ranks of the same shape, NaN where the value is missing
+    """
+    return (
+        pd.DataFrame(values)
+        .rank(axis=0, ascending=False, method="min")
+        .to_numpy()
+    )
+
+
+def build_panel(df: pd.DataFrame) -> TrendPanel:
+    """Build the annual panel from the cleaned HDI trends dataframe.
+
+    Args:
+        df (pd.DataFrame): output of preprocess_data on the trends page
+
+    Returns:
+        TrendPanel: the interpolated panel with yearly ranks
+    """
+    year_columns = sorted(
+        (col for col in df.columns if col.startswith("hdi_")),
+        key=lambda col: int(col[-4:]),
+    )
+    years = np.array([int(col[-4:]) for col in year_columns])
+    values = df[year_columns].to_numpy(dtype=float)
+    grid = np.arange(years.min(), years.max() + 1)
+
+    interpolated = interpolate_years(values, years, grid)
+    observed = np.zeros(interpolated.shape, dtype=bool)
+    observed[:, np.searchsorted(grid, years)] = ~np.isnan(values)
+    return TrendPanel(
+        countries=df["country"].to_numpy(),
+        years=grid,
+        values=interpolated,
+        observed=observed,
+        ranks=rank_matrix(interpolated),
+    )
+
+
+def cagr(panel: TrendPanel, start: int, end: int) -> np.ndarray:
+    """Compound annual growth rate (%) of every country between two years.
+
+    Args:
+        panel (TrendPanel): the HDI panel
+        start (int): first year
+        end (int): last year, after start
+
+    Returns:
+        np.ndarray: growth rate per country, NaN where a value is missing
+    """
+    if end <= start:
+        raise ValueError("the end year must be after the start year")
+    v0 = panel.values[:, panel.year_index(start)]
+    v1 = panel.values[:, panel.year_index(end)]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return ((v1 / v0) ** (1 / (end - start)) - 1) * 100
+
+
+def compare_periods(panel: TrendPanel, start: int, end: int) -> pd.DataFrame:
+    """Tabulate HDI, growth and rank change of all countries for a period.
+
+    Args:
+        panel (TrendPanel): the HDI panel
+        start (int): first year
+        end (int): last year
+
+    Returns:
+        pd.DataFrame: one row per country. a positive rank change means the
+        country moved up.
+    """
+    i, j = panel.year_index(start), panel.year_index(end)
+    return pd.DataFrame(
+        {
+            "country": panel.countries,
+            f"hdi_{start}": panel.values[:, i],
+            f"hdi_{end}": panel.values[:, j],
+            f"avg hdi growth (%) {start}-{end}": cagr(panel, start, end),
+            f"rank {start}": panel.ranks[:, i],
+            f"rank {end}": panel.ranks[:, j],
+            f"change in hdi rank {start}-{end}": (
+                panel.ranks[:, i] - panel.ranks[:, j]
+            ),
+        }
+    )
@@ -0,0 +1,186 @@
+"""Watch `data_path` and re-ingest changed workbooks in the background.
+
+A changed file is parsed in the loader pool while the sessions keep using
+the previous version; only when the parse is done is the new version swapped
+in, with one assignment. Sheets whose content did not change keep their
+frames, so the dataset graph recomputes only the nodes of changed sheets.
+"""
+
+import logging
+import os
+import threading
+from concurrent.futures import Future
+from dataclasses import dataclass
+
+import pandas as pd
+
+from hdr.config import POP_GNIPC_WORKBOOK, data_path, get_flag, get_setting
+from hdr.datasets import sheet_fingerprints
+from hdr.fingerprints import fingerprint_file
+from hdr.quality import quality_report
+from hdr.schema import check_layouts
+
+logger = logging.getLogger(__name__)
+
+# seconds between two scans of data_path
+POLL_SECONDS = 2.0
+WORKBOOK_SUFFIX = ".xlsx"
+# workbooks read as one sheet, the way the pages load them
+SINGLE_SHEET = {POP_GNIPC_WORKBOOK: "Sheet1"}
+
+_lock = threading.Lock()
+_watcher: "DataWatcher | None" = None
+
+
+@dataclass(frozen=True)
+class Version:
+    """One ingested version of a workbook."""
+
+    fingerprint: str
+    data: dict[str, pd.DataFrame] | pd.DataFrame
+    sheet_fingerprints: dict[str, str]
+    changed: tuple[str, ...]
+
+
+def _sheets(data) -> dict[str, pd.DataFrame]:
+    return data if isinstance(data, dict) else {"": data}
+
+
+class DataWatcher(threading.Thread):
+    """Polls a directory and keeps the latest parsed version of each workbook.
+
+    The scan only stats the files; a file is hashed when its size or mtime
+    changed, and re-ingested when its content hash changed.
+    """
+
+    def __init__(self, directory: str, interval: float = POLL_SECONDS):
+        super().__init__(name="hdr-data-watcher", daemon=True)
+        self.directory = directory
+        self.interval = interval
+        self._stats: dict[str, tuple[int, int]] = {}
+        self._versions: dict[str, Version] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def run(self) -> None:
+        while True:
+            try:
+                self.scan()
+            except Exception:
+                # keep polling: a later scan may succeed
+                logger.exception("scanning %s failed", self.directory)
+            if self._stop.wait(self.interval):
+                return
+
+    def stop(self) -> None:
+        """Stop the watcher after the current scan."""
+        self._stop.set()
+
+    def scan(self) -> None:
+        """Stat the workbooks of the directory and re-ingest changed ones.
+
+        Changed files are parsed concurrently in the loader pool; this
+        thread waits for the parses and swaps the new versions in itself,
+        so the pool's result thread is never held up by the swap.
+        """
+        parses = []
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if not entry.name.endswith(WORKBOOK_SUFFIX):
+                    continue
+                stat = entry.stat()
+                signature = (stat.st_mtime_ns, stat.st_size)
+                if self._stats.get(entry.path) == signature:
+                    continue
+                self._stats[entry.path] = signature
+                fingerprint = fingerprint_file(entry.path)
+                current = self._versions.get(entry.path)
+                if current is not None and current.fingerprint == fingerprint:
+                    continue
+                parses.append(
+                    (entry.path, *self._ingest(entry.path, entry.name))
+                )
+        for path, fingerprint, future in parses:
+            try:
+                self._swap(path, fingerprint, future.result())
+            except Exception:
+                # retried once the file changes again
+                logger.exception("re-ingesting %s failed", path)
+
+    def _ingest(self, path: str, name: str) -> tuple[str, Future]:
+        from hdr.loaders import submit_workbook
+
+        # same arguments as the pages, so they share the parse
+        fingerprint, future = submit_workbook(path, SINGLE_SHEET.get(name))
+        logger.info("re-ingesting %s (%s)", path, fingerprint)
+        return fingerprint, future
+
+    def _swap(
+        self,
+        path: str,
+        fingerprint: str,
+        data: dict[str, pd.DataFrame] | pd.DataFrame,
+    ) -> None:
+        if isinstance(data, dict):
+            # a drifted layout would break the pages: keep serving the
+            # previous version until the file is fixed
+            drift = check_layouts(data)
+            for report in drift:
+                logger.error("%s not swapped in: %s", path, report)
+            if drift:
+                return
+        previous = self._versions.get(path)
+        old = _sheets(previous.data) if previous else {}
+        # also seeds the sheet hashes the pages' annex_sources look up
+        hashes = sheet_fingerprints(fingerprint, _sheets(data))
+        changed, kept = [], {}
+        for sheet, df in _sheets(data).items():
+            if previous and previous.sheet_fingerprints.get(sheet) == (
+                hashes[sheet]
+            ):
+                # unchanged sheet: keep the frame the sessions already share
+                kept[sheet] = old[sheet]
+            else:
+                kept[sheet] = df
+                changed.append(sheet)
+        if not isinstance(data, dict):
+            kept = kept[""]
+        version = Version(fingerprint, kept, hashes, tuple(changed))
+        with self._lock:
+            self._versions[path] = version
+        logger.info("%s updated, changed sheets: %s", path, changed)
+        if isinstance(data, dict):
+            # profile the new version before the pages ask for it
+            quality_report(fingerprint, kept)
+
+    def current(self, path: str) -> Version | None:
+        """The latest fully parsed version of a workbook, None if none yet."""
+        with self._lock:
+            return self._versions.get(path)
+
+
+def start_watcher() -> DataWatcher | None:
+    """Start watching `data_path` for changed workbooks.
+
+    Opt-in with `watch_data=true` in config.env; `watch_interval` sets the
+    seconds between two scans. Only the first call per process starts the
+    watcher; later calls return the running one.
+
+    Returns:
+        DataWatcher | None: the watcher, None if watching is off
+    """
+    global _watcher
+    with _lock:
+        if _watcher is not None:
+            return _watcher
+        if not get_flag("watch_data") or not os.path.isdir(data_path()):
+            return None
+        interval = float(get_setting("watch_interval", "") or POLL_SECONDS)
+        _watcher = DataWatcher(data_path(), interval)
+        _watcher.start()
+        return _watcher
+
+
+def current_version(path: str) -> Version | None:
+    """The latest version of a workbook seen by the running watcher, if any."""
+    return _watcher.current(path) if _watcher is not None else None
@@ -0,0 +1,134 @@
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+LIFE_COLUMN = "Life expectancy at birth"
+EYS_COLUMN = "Expected years of schooling"
+MYS_COLUMN = "Mean years of schooling"
+GNI_COLUMN = "Gross national income (GNI) per capita"
+MEANS = ("geometric", "arithmetic")
+
+
+@dataclass(frozen=True)
+class Goalposts:
+    """Minimum and maximum values used to normalize the HDI components.
+
+    The defaults are the goalposts of the HDR technical notes.
+    """
+
+    life_min: float = 20.0
+    life_max: float = 85.0
+    eys_max: float = 18.0
+    mys_max: float = 15.0
+    gni_min: float = 100.0
+    gni_max: float = 75_000.0
+
+
+OFFICIAL_GOALPOSTS = Goalposts()
+
+
+def dimension_indices(
+    life: np.ndarray,
+    eys: np.ndarray,
+    mys: np.ndarray,
+    gni: np.ndarray,
+    goalposts: Goalposts = OFFICIAL_GOALPOSTS,
+) -> np.ndarray:
+    """Health, education and income indices of the HDI.
+
+    The inputs may have any (common, broadcastable) shape, e.g. countries or
+    countries x years; everything is computed element-wise.
+
+    Args:
+        life (np.ndarray): life expectancy at birth
+        eys (np.ndarray): expected years of schooling
+        mys (np.ndarray): mean years of schooling
+        gni (np.ndarray): GNI per capita (2017 PPP $)
+        goalposts (Goalposts, optional): the normalization goalposts.
+
+    Returns:
+        np.ndarray: the indices stacked on a new last axis of length 3
+    """
+    g = goalposts
+    health = (life - g.life_min) / (g.life_max - g.life_min)
+    education = (
+        np.minimum(eys / g.eys_max, 1) + np.minimum(mys / g.mys_max, 1)
+    ) / 2
+    with np.errstate(invalid="ignore", divide="ignore"):
+        income = (np.log(gni) - np.log(g.gni_min)) / (
+            np.log(g.gni_max) - np.log(g.gni_min)
+        )
+    indices = np.stack([health, education, income], axis=-1)
+    return np.clip(indices, 0, 1)
+
+
+def combine(
+    indices: np.ndarray, weights: np.ndarray, mean: str = "geometric"
+) -> np.ndarray:
+    """Aggregate the dimension indices into an HDI.
+
+    Args:
+        indices (np.ndarray): output of dimension_indices
+        weights (np.ndarray): weights of health, education and income.
+            normalized to sum to 1.
+        mean (str, optional): "geometric" (official) or "arithmetic".
+
+    Returns:
+        np.ndarray: the HDI, with the shape of indices without the last axis
+    """
+    if mean not in MEANS:
+        raise ValueError(f"unknown mean: {mean}")
+    weights = np.asarray(weights, dtype=float)
+    if weights.sum() <= 0:
+        raise ValueError("at least one weight must be positive")
+    weights = weights / weights.sum()
+    if mean == "arithmetic":
+        return indices @ weights
+    with np.errstate(divide="ignore"):
+        # a dimension with zero weight drops out, even at an index of 0
+        logs = np.where(weights > 0, np.log(indices), 0.0)
+    return np.exp(logs @ weights)
+
+
+def recompute_hdi(
+    df: pd.DataFrame,
+    weights: tuple[float, float, float] = (1, 1, 1),
+    goalposts: Goalposts = OFFICIAL_GOALPOSTS,
+    mean: str = "geometric",
+) -> pd.DataFrame:
+    """Rebuild HDI and ranks of all countries and diff against the official.
+
+    Args:
+        df (pd.DataFrame): the cleaned annex dataframe (preprocess_data)
+        weights (tuple[float, float, float], optional): health, education
+            and income weights. Defaults to equal weights.
+        goalposts (Goalposts, optional): the normalization goalposts.
+        mean (str, optional): "geometric" (official) or "arithmetic".
+
+    Returns:
+        pd.DataFrame: official and recomputed HDI and rank per country.
+        a positive rank change means the country moves up.
+    """
+    components = (
+        df[[LIFE_COLUMN, EYS_COLUMN, MYS_COLUMN, GNI_COLUMN]]
+        .apply(pd.to_numeric, errors="coerce")
+        .to_numpy(dtype=float)
+    )
+    indices = dimension_indices(*components.T, goalposts=goalposts)
+    hdi = combine(indices, weights, mean)
+    rank = pd.Series(hdi).rank(ascending=False, method="min").to_numpy()
+    return pd.DataFrame(
+        {
+            "Country": df["Country"].to_numpy(),
+            "HDI": df["HDI"].to_numpy(),
+            "HDI_rank": df["HDI_rank"].to_numpy(),
+            "Health index": indices[:, 0],
+            "Education index": indices[:, 1],
+            "Income index": indices[:, 2],
+            "what-if HDI": hdi,
+            "what-if rank": rank,
+            "rank change": df["HDI_rank"].to_numpy() - rank,
+        },
+        index=df.index,
+    )
@@ -0,0 +1,25 @@
+"""Functions executed in the loader worker processes.
+
+Kept free of streamlit imports, so spawning a worker stays cheap.
+"""
+
+import io
+
+import pandas as pd
+
+
+def read_excel(
+    source: str | bytes, sheet_name: str | None = None
+) -> dict[str, pd.DataFrame] | pd.DataFrame:
+    """Parse a workbook given by path or by its raw bytes.
+
+    Args:
+        source (str | bytes): path of the workbook or its content
+        sheet_name (str | None, optional): the sheet to load. all if None.
+
+    Returns:
+        dict[str, pd.DataFrame] | pd.DataFrame: the parsed sheet(s)
+    """
+    if isinstance(source, bytes):
+        source = io.BytesIO(source)
+    return pd.read_excel(source, sheet_name=sheet_name)
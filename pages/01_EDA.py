@@ -1,103 +1,27 @@
-import os
 import warnings
-from typing import Tuple
 
 import pandas as pd
-import plotly.express as px
 import streamlit as st
-from dotenv import load_dotenv
 
-st.set_page_config(page_title="EDA", page_icon="📊", layout="wide")
-
-warnings.filterwarnings("ignore")
-load_dotenv("config.env")
-
-
-@st.cache_data
-def load_data(
-    file: str, sheet_name: str | None = None
-) -> dict[str, pd.DataFrame] | pd.DataFrame:
-    """
-    Load data from an Excel file into a DataFrame or a\
-        dictionary of DataFrames, and cache it.
-    Args:
-        file (str): The path or file-like object of the Excel file.
-        sheet_name (str | None): The name of the sheet to load.\
-            If None, all sheets are loaded.
-    Returns:
-        dict[str, pd.DataFrame] | pd.DataFrame:
-        - A dictionary of DataFrames if sheet_name is None.
-        - A single DataFrame if a specific sheet_name is provided.
-    """
-    return pd.read_excel(file, sheet_name=sheet_name)
-
-
-def merge_dataframes(
-    df_1: pd.DataFrame,
-    df_2: pd.DataFrame,
-    on: str = "Country",
-    how: str = "left",
-) -> pd.DataFrame:
-    """Merge two dataframes on a specified column.
-
-    Args:
-        df_1 (pd.DataFrame): the first dataframe
-        df_2 (pd.DataFrame): the second dataframe
-        on (str, optional): _description_. Defaults to "Country".
-        how (str, optional): _description_. Defaults to "left".
-
-    Returns:
-        pd.DataFrame: the output dataframe that is merged.
-    """
-    return df_1.merge(df_2, on=on, how=how).reset_index(drop=True)
+from hdr import datasets
+from hdr.charts import plotly_chart
+from hdr.clustering import CLUSTER_COLUMN, cluster_controls
+from hdr.config import annex_path, pop_gnipc_path
+from hdr.lazy import lazy_import
+from hdr.loaders import load_latest, load_workbook, submit_workbook
+from hdr.quality import QualityReport, quality_report
+from hdr.schema import SchemaDriftError, check_layouts
 
+# plotly is only imported once the first chart is drawn
+px = lazy_import("plotly.express")
 
-def preprocess_data(df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.Index]:
-    """Preprocess the dataframe by renaming columns,\
-        converting data types, and handling missing values.
-
-    Args:
-        df (pd.DataFrame): the raw dataframe
-
-    Returns:
-        Tuple[pd.DataFrame, pd.Index]: return a dataframe and pandas index
-    """
-
-    # filter and remove the columns that their names contain "unnamed".
-    df = df.loc[:, ~df.columns.str.contains("^Unnamed")]
-    # rename columns for clarity
-    rename_dict = {
-        "Human Development Index (HDI) ": "HDI",
-        "HDI rank.1": "HDI_rank",
-    }
-    # rename the columns to have better namings
-    df.rename(columns=rename_dict, inplace=True)
-    # Convert specified columns to numeric values
-    numeric_columns = [
-        "HDI",
-        "Expected years of schooling",
-        "Mean years of schooling",
-        "Gross national income (GNI) per capita",
-        "GNI per capita rank minus HDI rank",
-        "HDI_rank",
-    ]
-    # cast the specified columns to the numeric values
-    df[numeric_columns] = df[numeric_columns].apply(
-        pd.to_numeric, errors="coerce"
-    )
-
-    # drop the HDI rank column. it was redundant.
-    if "HDI rank" in df.columns:
-        df.drop("HDI rank", inplace=True, axis=1)
+st.set_page_config(page_title="EDA", page_icon="📊", layout="wide")
 
-    # get rid rows with missing values
-    df = df.dropna()
-    # get the numeric columns only
-    numeric_columns = df.select_dtypes(include="float64").columns[:-1]
-    return df, numeric_columns
+warnings.filterwarnings("ignore")
 
 
 # visualization functions
+@st.fragment
 def histogram_plot(
     df: pd.DataFrame, numeric_columns: pd.Index, histfunc: str = "avg"
 ) -> None:
@@ -126,9 +50,10 @@ def histogram_plot(
     fig = px.histogram(
         df, x=x_column, y=y_column, template="seaborn", histfunc=histfunc
     )
-    st.plotly_chart(fig)
+    plotly_chart(fig)
 
 
+@st.fragment
 def pie_plot(df: pd.DataFrame, numeric_columns: pd.Index) -> None:
     """Render a pie chart based on user-selected columns.
 
@@ -150,9 +75,10 @@ def pie_plot(df: pd.DataFrame, numeric_columns: pd.Index) -> None:
 
     # modify to show the exact values on the pie chart
     fig.update_traces(textinfo="label+value")
-    st.plotly_chart(fig)
+    plotly_chart(fig)
 
 
+@st.fragment
 def scatter_plot(df: pd.DataFrame, numeric_columns: pd.Index) -> None:
     """Render a scatter plot to visualize relationships between two columns."""
     x_column = st.selectbox(
@@ -163,6 +89,13 @@ def scatter_plot(df: pd.DataFrame, numeric_columns: pd.Index) -> None:
         "Choose a column for y axis:", options=numeric_columns, key="y_scatter"
     )
 
+    # colour by development cluster when the clustering is available
+    color = x_column
+    if CLUSTER_COLUMN in df.columns and st.checkbox(
+        "Colour by development cluster", key="cluster_scatter"
+    ):
+        color = CLUSTER_COLUMN
+
     st.title(f"Scatter plot of {x_column} vs. {y_column}")
     st.markdown(
         f"This scatter plot visualizes the relationship \
@@ -175,11 +108,12 @@ def scatter_plot(df: pd.DataFrame, numeric_columns: pd.Index) -> None:
         y=y_column,
         size=x_column,
         hover_data="HDI",
-        color=x_column,
+        color=color,
     )
-    st.plotly_chart(fig)
+    plotly_chart(fig)
 
 
+@st.fragment
 def parallel_coordinates_plot(df: pd.DataFrame) -> None:
     """Render a parallel coordinates plot to analyze multiple dimensions."""
 
@@ -192,7 +126,7 @@ def parallel_coordinates_plot(df: pd.DataFrame) -> None:
     # select columns for the plot
     selected_column = st.multiselect(
         "Select dimensions to include in the plot:",
-        options=clean_data.columns[1:-1],
+        options=df.columns.drop(CLUSTER_COLUMN, errors="ignore")[1:-1],
         default=[
             "HDI",
             "Life expectancy at birth",
@@ -201,17 +135,25 @@ def parallel_coordinates_plot(df: pd.DataFrame) -> None:
     )
 
     # dropdown menu for color scale customization
+    color_options = list(selected_column)
+    if CLUSTER_COLUMN in df.columns:
+        color_options.append(CLUSTER_COLUMN)
     color_column = st.selectbox(
         "Select a column for the color scale:",
-        options=selected_column,
+        options=color_options,
         index=0,  # Default to the first dimension
     )
 
     if selected_column:
+        # parallel coordinates need a numeric color. use the cluster number
+        color = df[color_column]
+        if color_column == CLUSTER_COLUMN:
+            color = pd.to_numeric(color, errors="coerce")
+
         fig = px.parallel_coordinates(
             df,
             dimensions=selected_column,
-            color=color_column,
+            color=color,
             labels={col: col.replace("_", "") for col in selected_column},
             color_continuous_scale=px.colors.sequential.Purples,
         )
@@ -220,11 +162,12 @@ def parallel_coordinates_plot(df: pd.DataFrame) -> None:
         fig.update_layout(margin=dict(l=100, r=100, t=50, b=50))
 
         # Display the plot in Streamlit
-        st.plotly_chart(fig, use_container_width=True)
+        plotly_chart(fig, use_container_width=True)
     else:
         st.warning("Please select at least one dimension to create the plot.")
 
 
+@st.fragment
 def treemap_plot(df: pd.DataFrame) -> None:
     st.title("Tree map of GNI per capita")
     st.markdown(
@@ -241,9 +184,10 @@ def treemap_plot(df: pd.DataFrame) -> None:
         labels={"GNIPC": "GNI per capita (USD)"},
         title="GNI per capita treemap",
     )
-    st.plotly_chart(fig)
+    plotly_chart(fig)
 
 
+@st.fragment
 def correlation_heatmap_plot(df: pd.DataFrame) -> None:
     st.title("Correlation matrix heatmap")
 
@@ -287,9 +231,37 @@ def correlation_heatmap_plot(df: pd.DataFrame) -> None:
         width=800,
         height=600,
     )
-    st.plotly_chart(fig)
+    plotly_chart(fig)
+
+
+@st.fragment
+def quality_panel(report: QualityReport) -> None:
+    """Show the data-quality profile of the workbook.
+
+    Args:
+        report (QualityReport): the profile of every sheet
+    """
+    with st.expander("Data quality"):
+        st.dataframe(report.summary())
+        sheet = st.selectbox(
+            "Sheet", options=report.summary().index, key="quality_sheet"
+        )
+        profile = report.sheet(sheet)
+        st.markdown("**Columns**")
+        st.dataframe(profile.columns.drop(columns="sheet"), hide_index=True)
+        st.markdown("**Missing-value patterns**")
+        st.dataframe(
+            profile.patterns.drop(columns=["sheet", "signature"]),
+            hide_index=True,
+        )
+        if not profile.duplicates.empty:
+            st.markdown("**Countries on several rows**")
+            st.dataframe(
+                profile.duplicates.drop(columns="sheet"), hide_index=True
+            )
 
 
+@st.fragment
 def bar_chart_plot(df: pd.DataFrame) -> None:
     st.title("Bar chart of HDI rankings")
     st.markdown("Explore top or bottom 10 countries based on HDI rank")
@@ -322,12 +294,18 @@ def bar_chart_plot(df: pd.DataFrame) -> None:
         coloraxis_showscale=False,
         margin=dict(l=40, r=40, t=60, b=40),
     )
-    st.plotly_chart(fig)
+    plotly_chart(fig)
 
 
 if __name__ == "__main__":
     st.title("📌 Human Development Reports (HDR)")
 
+    # start parsing the population and GNI workbook right away. it is
+    # parsed in a worker process while the annex workbook is loaded.
+    pop_gnipc_fingerprint, pop_gnipc_future = submit_workbook(
+        pop_gnipc_path(), "Sheet1"
+    )
+
     # read the file from streamlit app
     uploaded_file = st.file_uploader(
         ":file_folder: Upload a file", type=(["xlsx"])
@@ -337,10 +315,40 @@ if __name__ == "__main__":
     if uploaded_file:
         # Store the uploaded file in session state
         st.session_state["uploaded_file"] = uploaded_file
-
-        # Load and cache the data
-    if "data" not in st.session_state:
-        st.session_state["data"] = load_data(uploaded_file)
+        source = uploaded_file
+    else:
+        # fall back to the default workbook in data_path
+        source = annex_path()
+
+    # Load the data. the sheets are shared by every session that loads a
+    # workbook with the same content; only a new file triggers a parse.
+    # with shared data or the data watcher on, follow the latest version of
+    # the default workbook unless this session uploaded its own.
+    loaded = None if uploaded_file else load_latest()
+    if loaded is None and (uploaded_file or "data" not in st.session_state):
+        loaded = load_workbook(source)
+    if loaded is not None:
+        st.session_state["data_source"] = (
+            "upload" if uploaded_file else "default"
+        )
+        fingerprint, sheets = loaded
+        if st.session_state.get("data_fingerprint") != fingerprint:
+            st.session_state["data"] = sheets
+            st.session_state["data_fingerprint"] = fingerprint
+
+    # check the headers of the known sheets before anything is processed
+    drift = check_layouts(st.session_state["data"])
+    for report in drift:
+        st.error(str(report).replace("\n", "\n\n"))
+    if drift:
+        st.stop()
+
+    # profiled once per workbook content, shared with the batch analysis
+    quality_panel(
+        quality_report(
+            st.session_state["data_fingerprint"], st.session_state["data"]
+        )
+    )
 
     # Display sheet names
     sheet_names = list(st.session_state["data"].keys())
@@ -351,34 +359,46 @@ if __name__ == "__main__":
         "Select a sheet for raw data", options=sheet_names
     )
 
-    # load and preprocess raw data
-    raw_data = load_data(uploaded_file.name, selected_sheet)
+    # the derived frames are recomputed only when the workbook or the
+    # selected sheet changes
+    sources = {
+        **datasets.annex_sources(
+            st.session_state["data_fingerprint"],
+            st.session_state["data"],
+        ),
+        "pop_gnipc": (pop_gnipc_fingerprint, pop_gnipc_future.result()),
+    }
     st.success("Data is loaded successfully.")
-    clean_data, numeric_columns = preprocess_data(raw_data)
-
-    # load population and GNI data
-    pop_gnipc_df = load_data(
-        os.path.join(os.getenv("data_path"), "pop_gnipc.xlsx"),
-        sheet_name="Sheet1",
+    try:
+        clean_data = datasets.get("hdi_clean", sources, sheet=selected_sheet)
+    except SchemaDriftError as error:
+        # the dashboard reads the selected sheet as an HDI table
+        st.error(str(error).replace("\n", "\n\n"))
+        st.stop()
+    numeric_columns = datasets.get(
+        "hdi_numeric_columns", sources, sheet=selected_sheet
     )
-    # multiply the poplulation column by one million.
-    pop_gnipc_df["Population"] *= 1_000_000
+    # the HDI table merged with the population
+    merged_df = datasets.get("hdi_merged", sources, sheet=selected_sheet)
 
-    # merge two dataframes
-    merged_df = merge_dataframes(clean_data, pop_gnipc_df)
+    # group the countries by development profile
+    clusters = cluster_controls(sources, key="eda", sheet=selected_sheet)
+    clustered_data = (
+        clusters.assign(clean_data) if clusters is not None else clean_data
+    )
 
     # create 2 columns
     col1, col2 = st.columns(2)
     with col1:
         histogram_plot(clean_data, numeric_columns)
-        scatter_plot(clean_data, numeric_columns)
+        scatter_plot(clustered_data, numeric_columns)
 
     with col2:
         pie_plot(clean_data, numeric_columns)
         correlation_heatmap_plot(clean_data)
 
     # parallel coordinates
-    parallel_coordinates_plot(clean_data)
+    parallel_coordinates_plot(clustered_data)
     # create a treemap
     treemap_plot(merged_df)
     # bar chart
@@ -1,9 +1,23 @@
+import numpy as np
 import pandas as pd
-from typing import Tuple
 import streamlit as st
-import plotly.express as px
-import plotly.graph_objects as go
 
+from hdr import datasets
+from hdr.charts import plotly_chart
+from hdr.exports import download_data
+from hdr.lazy import lazy_import
+from hdr.loaders import sync_session_data
+from hdr.regression import (
+    GNI_COLUMN,
+    METHODS,
+    RegressionSpec,
+    cached_fit_regression,
+)
+from hdr.whatif import MEANS, OFFICIAL_GOALPOSTS, Goalposts, recompute_hdi
+
+# plotly is only imported once the first chart is drawn
+px = lazy_import("plotly.express")
+go = lazy_import("plotly.graph_objects")
 
 st.set_page_config(
     page_title="Statistical Analysis",
@@ -11,59 +25,29 @@ st.set_page_config(
 )
 
 
-def preprocess_data(df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.Index]:
-    """Preprocess the dataframe by renaming columns, converting data types, and handling missing values.
-
-    Args:
-        df (pd.DataFrame): the raw dataframe
+# descriptive statistics
+@st.fragment
+def summary_statistics(df: pd.DataFrame) -> None:
+    st.title("Summary Statistics")
 
-    Returns:
-        Tuple[pd.DataFrame, pd.Index]: return a dataframe and pandas index
-    """
+    summary_stats = df.describe(
+        percentiles=[0.1, 0.25, 0.5, 0.75, 0.9])
+    st.write(summary_stats)
+    # download it
+    download_data(summary_stats, "summary_stats")
 
-    # filter and remove the columns that their names contain "unnamed".
-    df = df.loc[:, ~df.columns.str.contains("^Unnamed")]
-    # rename columns for clarity
-    rename_dict = {"Human Development Index (HDI) ": "HDI",
-                   "HDI rank.1": "HDI_rank"}
-    # rename the columns to have better namings
-    df.rename(columns=rename_dict, inplace=True)
-    # Convert specified columns to numeric values
-    numeric_columns = [
-        "HDI",
-        "Expected years of schooling",
-        "Mean years of schooling",
-        "Gross national income (GNI) per capita",
-        "GNI per capita rank minus HDI rank",
-        "HDI_rank"
-    ]
-    # cast the specified columns to the numeric values
-    df[numeric_columns] = df[numeric_columns].apply(
-        pd.to_numeric, errors="coerce")
-
-    # drop the HDI rank column. it was redundant.
-    if "HDI rank" in df.columns:
-        df.drop("HDI rank", inplace=True, axis=1)
-
-    # get rid rows with missing values
-    df = df.dropna()
-    # get the numeric columns only
-    numeric_columns = df.select_dtypes(include="float64").columns[:-1]
-    return df, numeric_columns
-
-
-def convert_df_to_csv(df: pd.DataFrame, file_name: str):
-    csv = df.to_csv(index=False).encode("utf-8")
-    st.download_button(
-        label="Download data as CSV",
-        data=csv,
-        file_name=file_name,
-        mime="text/csv"
-    )
 
-# descriptive statistics
+@st.fragment
+def column_summary(df: pd.DataFrame) -> None:
+    column = st.selectbox(
+        "Select a column to view summary stats:", options=df.columns[1:-1], key="summary_stats")
+    st.subheader(f"Summary statistics of {column} column")
+    summary_stats = df[column].describe()
+    st.write(summary_stats)
+    download_data(summary_stats, f"summary stats of {column} column")
 
 
+@st.fragment
 def histogram_plot(df: pd.DataFrame) -> None:
 
     # Add a dropdown to select which column to plot
@@ -81,9 +65,10 @@ def histogram_plot(df: pd.DataFrame) -> None:
         labels={column: column},
         color_discrete_sequence=['skyblue']
     )
-    st.plotly_chart(fig)
+    plotly_chart(fig)
 
 
+@st.fragment
 def box_plot(df: pd.DataFrame) -> None:
 
     # Add a dropdown to select which column to plot
@@ -105,56 +90,185 @@ def box_plot(df: pd.DataFrame) -> None:
         hovertemplate="<br>Value: %{y}<extra></extra>"
     )
 
-    st.plotly_chart(fig)
+    plotly_chart(fig)
 
 
-def display_correlation_matrix(df: pd.DataFrame) -> None:
-    numeric_df = df.select_dtypes(include=['float64', 'int64'])
-    correlation_matrix = numeric_df.corr()
-
+@st.fragment
+def display_correlation_matrix(correlation_matrix: pd.DataFrame) -> None:
     st.subheader("Correlation Matrix for Numeric Columns")
     st.dataframe(correlation_matrix)
     # download it
-    convert_df_to_csv(correlation_matrix, "corr.csv")
+    download_data(correlation_matrix, "corr")
 
 
-def group_data(df: pd.DataFrame) -> None:
+@st.fragment
+def group_data(df: pd.DataFrame, sources: datasets.Sources) -> None:
     column = st.selectbox("Select a column to group by:",
                           options=df.columns[1:-1], key="groupby")
 
-    grouped_by = df.groupby(column).agg({
-        "HDI": ["mean", "median", "min", "max"],
-        "Life expectancy at birth": ["mean", "median", "min", "max"]
-    })
+    # memoized per (workbook, column)
+    grouped_by = datasets.get("hdi_grouped", sources, by=column)
     st.subheader(f"Aggregated Data Grouped by {column}")
     st.write(grouped_by)
 
-    convert_df_to_csv(df,"groupby.csv")
+    download_data(df, "groupby")
+
+
+@st.fragment
+def regression_analysis(df: pd.DataFrame, sources: datasets.Sources) -> None:
+    """Fit a regression model and show bootstrap confidence intervals.
+
+    Args:
+        df (pd.DataFrame): the cleaned dataframe
+        sources (datasets.Sources): the sources of the workbook
+    """
+    st.title("Regression Analysis")
+
+    numeric_columns = df.select_dtypes(include="number").columns.drop(
+        "HDI_rank", errors="ignore")
+    target = st.selectbox(
+        "Select the dependent variable:", options=numeric_columns,
+        index=numeric_columns.get_loc("HDI"), key="regression_target")
+    candidates = [col for col in numeric_columns if col != target]
+    features = st.multiselect(
+        "Select the explanatory variables:", options=candidates,
+        default=[GNI_COLUMN] if GNI_COLUMN in candidates else None,
+        key="regression_features")
+    log_gni = st.checkbox(
+        "Use the log of GNI per capita", value=True, key="regression_log")
+    method = st.radio(
+        "Estimator:", options=METHODS, horizontal=True,
+        format_func={"ols": "OLS", "huber": "Robust (Huber)"}.get,
+        key="regression_method")
+    n_boot = st.select_slider(
+        "Number of bootstrap samples:", options=[200, 500, 1000, 2000, 5000],
+        value=1000, key="regression_boot")
+    ci = st.slider("Confidence level:", min_value=0.80, max_value=0.99,
+                   value=0.95, step=0.01, key="regression_ci")
+
+    if not features:
+        st.warning("Please select at least one explanatory variable.")
+        return
+
+    spec = RegressionSpec(target, tuple(features), log_gni, method)
+    try:
+        with st.spinner("Fitting regression..."):
+            result = cached_fit_regression(sources, spec, n_boot=n_boot)
+    except ValueError as error:
+        st.warning(str(error))
+        return
+
+    st.markdown(
+        f"**R²:** {result.r_squared:.3f} &nbsp; **Observations:** {result.n_obs}")
+    summary = result.summary(ci)
+    st.dataframe(summary)
+    download_data(summary, "regression")
+
+    # with a single explanatory variable show the fitted line
+    if len(features) == 1:
+        x_label = result.terms[1]
+        x = df[features[0]]
+        if log_gni and features[0] == GNI_COLUMN:
+            x = np.log(x.where(x > 0))
+        fitted = result.predict(df)
+        order = np.argsort(x.to_numpy())
+        fig = go.Figure()
+        fig.add_trace(go.Scatter(
+            x=x, y=df[target], mode="markers", name="Countries",
+            text=df["Country"]))
+        fig.add_trace(go.Scatter(
+            x=x.to_numpy()[order], y=fitted.to_numpy()[order], mode="lines",
+            name="Fitted line"))
+        fig.update_layout(xaxis_title=x_label, yaxis_title=target)
+        plotly_chart(fig)
+
+
+@st.fragment
+def what_if_hdi(df: pd.DataFrame) -> None:
+    """Recompute HDI and ranks under custom weights and goalposts.
+
+    Args:
+        df (pd.DataFrame): the cleaned dataframe
+    """
+    st.title("What-if HDI")
+    st.markdown(
+        "Rebuild the HDI of every country from its components with your own\
+            weights, goalposts or an arithmetic mean, and compare the ranks\
+                with the official ones.")
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        health = st.slider("Health weight:", 0.0, 1.0, 1 / 3, 0.01,
+                           key="whatif_health")
+    with col2:
+        education = st.slider("Education weight:", 0.0, 1.0, 1 / 3, 0.01,
+                              key="whatif_education")
+    with col3:
+        income = st.slider("Income weight:", 0.0, 1.0, 1 / 3, 0.01,
+                           key="whatif_income")
+    mean = st.radio("Aggregation:", options=MEANS, horizontal=True,
+                    key="whatif_mean")
+
+    official = OFFICIAL_GOALPOSTS
+    with st.expander("Goalposts"):
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            life_min = st.number_input(
+                "Life expectancy min:", value=official.life_min)
+            life_max = st.number_input(
+                "Life expectancy max:", value=official.life_max)
+        with col2:
+            eys_max = st.number_input(
+                "Expected years of schooling max:", value=official.eys_max)
+            mys_max = st.number_input(
+                "Mean years of schooling max:", value=official.mys_max)
+        with col3:
+            gni_min = st.number_input(
+                "GNI per capita min:", value=official.gni_min)
+            gni_max = st.number_input(
+                "GNI per capita max:", value=official.gni_max)
+    goalposts = Goalposts(life_min, life_max, eys_max, mys_max,
+                          gni_min, gni_max)
+
+    try:
+        result = recompute_hdi(
+            df, (health, education, income), goalposts, mean)
+    except ValueError as error:
+        st.warning(str(error))
+        return
+
+    moved = result["rank change"].abs()
+    st.markdown(
+        f"**Countries changing rank:** {(moved > 0).sum()} &nbsp; "
+        f"**Mean absolute rank change:** {moved.mean():.1f}")
+
+    fig = px.scatter(
+        result, x="HDI", y="what-if HDI", hover_name="Country",
+        color="rank change", color_continuous_scale="RdBu",
+        color_continuous_midpoint=0,
+        labels={"HDI": "Official HDI"})
+    plotly_chart(fig)
+
+    st.dataframe(
+        result.sort_values("rank change", key=abs, ascending=False),
+        hide_index=True)
+    download_data(result, "what_if_hdi")
 
 
 if __name__ == "__main__":
     # load data from the session state of streamlit.
+    sync_session_data()
     if "data" in st.session_state:
-        raw_data = st.session_state["data"]["HDI"]
+        sources = datasets.annex_sources(st.session_state["data_fingerprint"],
+                                         st.session_state["data"])
     else:
         st.warning("No data loaded! Please upload an Excel file on the EDA page.")
 
-    clean_data, _ = preprocess_data(raw_data)
+    clean_data = datasets.get("hdi_clean", sources)
 
-    st.title("Summary Statistics")
-
-    summary_stats = clean_data.describe(
-        percentiles=[0.1, 0.25, 0.5, 0.75, 0.9])
-    st.write(summary_stats)
-    # download it as csv
-    convert_df_to_csv(summary_stats, "summary_stats.csv")
-
-    column = st.selectbox(
-        "Select a column to view summary stats:", options=clean_data.columns[1:-1], key="summary_stats")
-    st.subheader(f"Summary statistics of {column} column")
-    summary_stats = clean_data[column].describe()
-    st.write(summary_stats)
-    convert_df_to_csv(summary_stats, f"summary stats of {column} column.csv")
+    # summary statistics of all columns and of a selected one
+    summary_statistics(clean_data)
+    column_summary(clean_data)
 
     # data distribution analysis
     st.title("Data Distribution Analysis")
@@ -163,7 +277,13 @@ if __name__ == "__main__":
     box_plot(clean_data)
 
     # pairwise correlation
-    display_correlation_matrix(clean_data)
+    display_correlation_matrix(datasets.get("hdi_correlation", sources))
 
     # group by data
-    group_data(clean_data)
+    group_data(clean_data, sources)
+
+    # regression models
+    regression_analysis(clean_data, sources)
+
+    # recompute the hdi with custom weights and goalposts
+    what_if_hdi(clean_data)
@@ -1,121 +1,72 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import os
-import numpy as np
 
+from hdr import datasets
+from hdr.charts import plotly_chart
+from hdr.forecast import (
+    FORECAST_YEAR,
+    MODELS,
+    cached_forecasts,
+    forecast_frame,
+)
+from hdr.lazy import lazy_import
+from hdr.loaders import sync_session_data
+from hdr.similarity import METRICS, cached_index
+from hdr.trends import TrendPanel, compare_periods
 
-st.set_page_config(page_title="Trends",
-                   page_icon="📑")
-
-# lazy load data. cache the data
-@st.cache_data
-def load_data(filename: str, sheet: str) -> pd.DataFrame:
-    """Load data from an excel file.
-
-    Args:
-        filename (str): name of the excel file to be read
-        sheet (str): name of the sheet of the excel file
-
-    Returns:
-        pd.DataFrame: a pandas df is created. streamlit caches the data.
-    """
-    return pd.read_excel(filename, sheet_name=sheet)
+# plotly is only imported once the first chart is drawn
+px = lazy_import("plotly.express")
 
 
-def preprocess_data(df: pd.DataFrame) -> pd.DataFrame:
-    """clean and preprocess the hdi trends data.
-
-    Args:
-        df (pd.dataFrame): the input dataframe
-
-    Returns:
-        pd.DataFrame: the cleaned dataframe
-    """
-
-    # standardize column names snd types
-    df.columns = df.columns.astype(str)
-    # remove the columns containing "Unnamed" in their names
-    df = df.loc[:, ~df.columns.str.contains("^Unnamed")]
-    # there is a column named "a". drop it
-    df.drop(["a"], inplace=True, axis=1)
-    # standardize column names
-    df.columns = (df.columns.str.strip()
-                  .str.lower()
-                  .str.replace(' ', '_'))
-
-    # handle numeric columns
-    numeric_columns = df.columns[2:]
-    # replace ".." with Numpy's NaN
-    df[numeric_columns] = df[numeric_columns].replace(
-        "..", np.nan).astype(float)
-
-    # rename columns for clarity
-    rename_dict = {
-        "hdi_rank": "rank based on hdi",
-        "1990": "hdi_1990", "2000": "hdi_2000", "2010": "hdi_2010", "2015": "hdi_2015",
-        "2019": "hdi_2019",
-        "2020": "hdi_2020", "2021": "hdi_2021", "2022": "hdi_2022",
-        "2015-2022": "change in hdi rank 2015-2022",
-        "1990-2000": "avg hdi growth (%) 1990-2000",
-        "2000-2010": "avg hdi growth (%) 2000-2010",
-        "2010-2022": "avg hdi growth (%) 2010-2022",
-        "1990-2022": "avg hdi growth (%) 1990-2022"
-    }
-
-    # rename columns
-    df.rename(columns=rename_dict, inplace=True)
-
-    return df
-
-
-def transform_to_long_format(df: pd.DataFrame) -> pd.DataFrame:
-    """Transform the data to a long format for visualization.
-
-    Args:
-        df (pd.DataFrame): initial dataframe to be transformed into long format.
-
-    Returns:
-        pd.DataFrame: the output dataframe that is in long format.
-    """
-
-    long_df = pd.melt(
-        df,
-        id_vars=["country"],
-        value_vars=[col for col in df.columns if col.startswith("hdi_")],
-        var_name="year",
-        value_name="hdi"
-    )
-
-    long_df["year"] = long_df["year"].str.extract(r"(\d{4})").astype(int)
-
-    return long_df
+st.set_page_config(page_title="Trends",
+                   page_icon="📑")
 
 
-def plot_hdi_trends(data: pd.DataFrame, countries: list) -> None:
+def plot_hdi_trends(data: pd.DataFrame, countries: list,
+                    key: str | None = None,
+                    forecast: pd.DataFrame | None = None) -> None:
     """Generate and display the hdi trends chart
 
     Args:
         data (pd.DataFrame): the initial data
         countries (list): list of countries to be shown
+        key (str | None, optional): unique key of the chart element
+        forecast (pd.DataFrame | None, optional): projected hdi values in
+            the same long format. drawn as a dotted continuation.
     """
 
     # filter data based on selected countries
     filtered_data = data[data["country"].isin(countries)]
 
+    if forecast is not None:
+        # start the continuation at each country's last observed value
+        last_observed = (filtered_data.dropna(subset=["hdi"])
+                         .sort_values("year")
+                         .groupby("country").tail(1))
+        projected = pd.concat([
+            last_observed,
+            forecast[forecast["country"].isin(countries)]])
+        filtered_data = pd.concat([
+            filtered_data.assign(series="observed"),
+            projected.assign(series="forecast")], ignore_index=True)
+
     # create the plotly line chart
     fig = px.line(
         filtered_data,
         x="year",
         y="hdi",
         color="country",
+        line_dash="series" if forecast is not None else None,
         title="HDI Trends Over Time",
-        labels={"hdi": "HDI", "year": "Year", "country": "Country"}
+        labels={"hdi": "HDI", "year": "Year", "country": "Country",
+                "series": "Series"}
     )
 
-    # update traces to make all lines dashed
+    # update traces to make all lines dashed. forecasts are dotted
     fig.for_each_trace(lambda trace: trace.update(
-        line=dict(dash="dash", width=1), opacity=0.5))
+        line=dict(dash="dot" if trace.name.endswith("forecast") else "dash",
+                  width=1),
+        opacity=0.5))
 
     # add interactivity
     fig.update_traces(mode="lines+markers")
@@ -123,19 +74,138 @@ def plot_hdi_trends(data: pd.DataFrame, countries: list) -> None:
                       width=2000,
                       height=700)
 
-    st.plotly_chart(fig, use_container_width=True)
+    plotly_chart(fig, use_container_width=True, key=key)
+
+
+@st.fragment
+def hdi_trends_section(sources: datasets.Sources, long_data: pd.DataFrame,
+                       default_countries: list) -> None:
+    """Render the country selection, the projections and the trends chart.
+
+    Args:
+        sources (datasets.Sources): the sources of the workbook
+        long_data (pd.DataFrame): the hdi trends in long format
+        default_countries (list): the countries selected by default
+    """
+    # multi-select widget for countries
+    st.info("Default is top 5 countries 🗺️")
+
+    selected_countries = st.multiselect(
+        "Select countries to display:",
+        options=long_data["country"].unique(),
+        default=default_countries)
+
+    # projections to FORECAST_YEAR
+    forecast = None
+    show_forecast = st.checkbox(f"Show HDI projections to {FORECAST_YEAR}")
+    if show_forecast:
+        model = st.radio("Forecast model:", options=list(MODELS),
+                         format_func=MODELS.get, horizontal=True)
+        with st.spinner("Fitting forecasts..."):
+            fits, backtest_scores = cached_forecasts(sources)
+        forecast = forecast_frame(fits[model])
+
+    # generate and plot the visual
+    plot_hdi_trends(long_data, selected_countries, forecast=forecast)
+
+    if show_forecast:
+        with st.expander("Forecast details"):
+            st.markdown("**95% prediction intervals** (the damped trend's "
+                        "are given its fitted damping factor)")
+            st.dataframe(
+                forecast[forecast["country"].isin(selected_countries)],
+                hide_index=True)
+            st.markdown("**Backtest on the last three published years**")
+            st.dataframe(backtest_scores)
+
+
+@st.fragment
+def similar_countries(sources: datasets.Sources,
+                      long_data: pd.DataFrame) -> None:
+    """Find the countries whose HDI developed most like a selected one.
+
+    Args:
+        sources (datasets.Sources): the sources of the workbook
+        long_data (pd.DataFrame): the hdi trends in long format
+    """
+    st.title("Countries with a similar development")
+
+    metric = st.radio(
+        "Distance:", options=list(METRICS), format_func=METRICS.get,
+        horizontal=True, key="similar_metric")
+    with st.spinner("Building similarity index..."):
+        index = cached_index(sources, metric)
+    countries = index.countries.tolist()
+    country = st.selectbox(
+        "Select a country:", options=countries, key="similar_country")
+    k = st.slider("Number of similar countries:", min_value=1,
+                  max_value=10, value=5, key="similar_k")
+
+    neighbours = index.neighbours(country, k=k, metric=metric)
+    st.dataframe(neighbours, hide_index=True)
+    plot_hdi_trends(
+        long_data, [country] + neighbours["country"].tolist(),
+        key="similar_trends")
+
+
+@st.fragment
+def plot_period_comparison(panel: TrendPanel) -> None:
+    """Compare HDI growth and rank changes of all countries over a period.
+
+    Args:
+        panel (TrendPanel): the annual HDI panel
+    """
+    st.title("Compare periods")
+    st.info("Years between the published ones are linearly interpolated.")
+
+    years = panel.years.tolist()
+    start, end = st.select_slider(
+        "Select the period:", options=years, value=(years[0], years[-1]))
+    if start == end:
+        st.warning("Please select a period of at least one year.")
+        return
+
+    comparison = compare_periods(panel, start, end)
+    growth_column = f"avg hdi growth (%) {start}-{end}"
+    rank_column = f"change in hdi rank {start}-{end}"
+
+    col1, col2 = st.columns(2)
+    with col1:
+        fig = px.bar(
+            comparison.nlargest(10, growth_column),
+            x="country",
+            y=growth_column,
+            title=f"Fastest HDI growth {start}-{end}",
+            labels={"country": "Country"},
+        )
+        plotly_chart(fig, use_container_width=True)
+    with col2:
+        fig = px.bar(
+            comparison.nlargest(10, rank_column),
+            x="country",
+            y=rank_column,
+            title=f"Largest rank gains {start}-{end}",
+            labels={"country": "Country"},
+        )
+        plotly_chart(fig, use_container_width=True)
+
+    st.dataframe(
+        comparison.sort_values(growth_column, ascending=False),
+        hide_index=True)
 
 
 # main workflow
 if __name__ == "__main__":
     # load data from the session state of streamlit.
+    sync_session_data()
     if "data" in st.session_state:
-        raw_data=st.session_state["data"]["HDI trends"]
+        sources = datasets.annex_sources(st.session_state["data_fingerprint"],
+                                         st.session_state["data"])
     else:
         st.warning("No data loaded! Please upload an excel file on the EDA page!")
-    clean_data = preprocess_data(raw_data)
-    # st.write(clean_data)
-    long_data = transform_to_long_format(clean_data)
+    # cleaned and long-format trends, recomputed only for a new workbook
+    clean_data = datasets.get("trends_clean", sources)
+    long_data = datasets.get("trends_long", sources)
 
     # get the top 5 countries for default option of the visualization
     default_countries = clean_data.sort_values(
@@ -144,13 +214,11 @@ if __name__ == "__main__":
     # streamlit app's title
     st.title("HDI trends visualization")
 
-    # multi-select widget for countries
-    st.info("Default is top 5 countries 🗺️")
+    # countries, projections and the trends chart
+    hdi_trends_section(sources, long_data, default_countries)
 
-    selected_countries = st.multiselect(
-        "Select countries to display:",
-        options=long_data["country"].unique(),
-        default=default_countries)
+    # countries that developed like a selected one
+    similar_countries(sources, long_data)
 
-    # generate and plot the visual
-    plot_hdi_trends(long_data, selected_countries)
+    # growth and rank changes of all countries over any period
+    plot_period_comparison(datasets.get("trends_panel", sources))
@@ -1,12 +1,16 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-from dotenv import load_dotenv
-import os
-from typing import Tuple
 
-load_dotenv("config.env")
+from hdr import datasets
+from hdr.charts import plotly_chart
+from hdr.clustering import CLUSTER_COLUMN, cluster_controls
+from hdr.config import pop_gnipc_path
+from hdr.lazy import lazy_import
+from hdr.loaders import submit_workbook, sync_session_data
+
+# plotly is only imported once the first chart is drawn
+px = lazy_import("plotly.express")
+go = lazy_import("plotly.graph_objects")
 
 st.set_page_config(
     page_title="Map",
@@ -14,87 +18,26 @@ st.set_page_config(
     layout="wide")
 
 
-@st.cache_data
-def load_data(filename: str, sheet: str) -> pd.DataFrame:
-    """Load data from an excel file.
-
-    Args:
-        filename (str): name of the excel file to be read
-        sheet (str): name of the sheet of the excel file
-
-    Returns:
-        pd.DataFrame: a pandas df is created. streamlit caches the data.
-    """
-    return pd.read_excel(filename, sheet_name=sheet)
-
-
-def preprocess_data(df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.Index]:
-    """Preprocess the dataframe by renaming columns, converting data types, and handling missing values.
-
-    Args:
-        df (pd.DataFrame): the raw dataframe
-
-    Returns:
-        Tuple[pd.DataFrame, pd.Index]: return a dataframe and pandas index
-    """
-
-    # filter and remove the columns that their names contain "unnamed".
-    df = df.loc[:, ~df.columns.str.contains("^Unnamed")]
-    # rename columns for clarity
-    rename_dict = {"Human Development Index (HDI) ": "HDI",
-                   "HDI rank.1": "HDI_rank"}
-    # rename the columns to have better namings
-    df.rename(columns=rename_dict, inplace=True)
-    # Convert specified columns to numeric values
-    numeric_columns = [
-        "HDI",
-        "Expected years of schooling",
-        "Mean years of schooling",
-        "Gross national income (GNI) per capita",
-        "GNI per capita rank minus HDI rank",
-        "HDI_rank"
-    ]
-    # cast the specified columns to the numeric values
-    df[numeric_columns] = df[numeric_columns].apply(
-        pd.to_numeric, errors="coerce")
-
-    # drop the HDI rank column. it was redundant.
-    if "HDI rank" in df.columns:
-        df.drop("HDI rank", inplace=True, axis=1)
-
-    # get rid rows with missing values
-    df = df.dropna()
-    # get the numeric columns only
-    numeric_columns = df.select_dtypes(include="float64").columns[:-1]
-    return df, numeric_columns
-
-
-def merge_dataframes(df_1: pd.DataFrame, df_2: pd.DataFrame, on: str = "Country", how: str = "left") -> pd.DataFrame:
-    """Merge two dataframes on a specified column.
-
-    Args:
-        df_1 (pd.DataFrame): the first dataframe
-        df_2 (pd.DataFrame): the second dataframe
-        on (str, optional): _description_. Defaults to "Country".
-        how (str, optional): _description_. Defaults to "left".
-
-    Returns:
-        pd.DataFrame: the output dataframe that is merged.
-    """
-    return df_1.merge(df_2, on=on, how=how).reset_index(drop=True)
-
 # visualization functions
 
 
+@st.fragment
 def choropleth_plot(df: pd.DataFrame) -> None:
 
     st.header("HDI Across Countries")
+
+    # colour by development cluster when the clustering is available
+    color_column = "HDI"
+    if CLUSTER_COLUMN in df.columns and st.checkbox(
+            "Colour by development cluster", key="cluster_map"):
+        color_column = CLUSTER_COLUMN
+
     fig = go.Figure(data=go.Choropleth(
-        locations=merged_df["Country"],
+        locations=df["Country"],
         locationmode="country names",
-        z=merged_df["HDI"],
-        colorscale="Blues",
-        colorbar_title="HDI"
+        z=pd.to_numeric(df[color_column], errors="coerce"),
+        colorscale="Blues" if color_column == "HDI" else "Viridis",
+        colorbar_title=color_column
     ))
 
     fig.update_layout(
@@ -104,46 +47,56 @@ def choropleth_plot(df: pd.DataFrame) -> None:
             projection_type="natural earth",
         )
     )
-    st.plotly_chart(fig, use_container_width=True)
+    plotly_chart(fig, use_container_width=True)
 
 
+@st.fragment
 def bubblemap_plot(df: pd.DataFrame) -> None:
     
     st.header("Bubble map: Population size across countries")
     fig = px.scatter_geo(
-        merged_df,
+        df,
         locations="Country",
         locationmode="country names",
         size="Population",
         color="HDI",
         hover_name="Country",
-        hover_data={"Population": False, "Formatted Population": True},
+        # formatted in the browser, so the hover data stays numeric
+        hover_data={"Population": ":,.0f"},
         projection="natural earth",
         size_max=50
     )
 
-    st.plotly_chart(fig, use_container_width=True)
+    plotly_chart(fig, use_container_width=True)
 
 
 # main workflow
 if __name__ == "__main__":
+    # start parsing the population and GNI workbook in a worker process
+    pop_gnipc_fingerprint, pop_gnipc_future = submit_workbook(
+        pop_gnipc_path(), "Sheet1")
+
     # load data from the session state of streamlit.
+    sync_session_data()
     if "data" in st.session_state:
-        raw_data_hdi = st.session_state["data"]["HDI"]
+        sources = datasets.annex_sources(st.session_state["data_fingerprint"],
+                                         st.session_state["data"])
     else:
         st.warning("No data loaded! Please upload an excel file on the EDA page!")
 
-    clean_data_hdi, _ = preprocess_data(raw_data_hdi)
-    pop_gnipc_df = load_data(os.path.join(
-        os.getenv("data_path"), "pop_gnipc.xlsx"), "Sheet1")
-    # multiply the poplulation column by one million.
-    pop_gnipc_df["Population"] *= 1_000_000
-    # merge two dataframes
-    merged_df = merge_dataframes(clean_data_hdi, pop_gnipc_df)
-
-    # Format population with commas
-    merged_df["Formatted Population"] = merged_df["Population"].apply(
-        lambda x: f"{x:,.0f}")
+    clean_data_hdi = datasets.get("hdi_clean", sources)
+    # group the countries by development profile
+    clusters = cluster_controls(sources, key="maps")
+    sources["pop_gnipc"] = (pop_gnipc_fingerprint, pop_gnipc_future.result())
+    # the HDI table merged with the population
+    merged_df = datasets.get("hdi_merged", sources)
+    if clusters is not None:
+        # one cluster per country name, so the lookup index is unique
+        cluster_of = clusters.assign(clean_data_hdi).drop_duplicates(
+            "Country").set_index("Country")
+        merged_df = merged_df.assign(**{
+            CLUSTER_COLUMN: merged_df["Country"].map(
+                cluster_of[CLUSTER_COLUMN])})
 
     col1,col2=st.columns(2)
     
@@ -0,0 +1,138 @@
+import time
+
+import streamlit as st
+
+from hdr.charts import plotly_chart
+from hdr.exports import download_data
+from hdr.lazy import lazy_import
+from hdr.loaders import sync_session_data
+from hdr.sql import connect, query_parameters, run_query, schema
+
+# plotly is only imported once the first chart is drawn
+px = lazy_import("plotly.express")
+
+st.set_page_config(page_title="Query", page_icon="🔎", layout="wide")
+
+# preset queries. $name placeholders become inputs on the page
+EXAMPLES = {
+    "Rich countries that lost HDI ranks": """\
+SELECT h.country,
+       h.gross_national_income_gni_per_capita AS gni_per_capita,
+       h.human_development_index_hdi AS hdi,
+       t.y2015_2022 AS hdi_rank_change_2015_2022
+FROM hdi AS h
+JOIN hdi_trends AS t USING (country)
+WHERE h.gross_national_income_gni_per_capita > $min_gni
+  AND t.y2015_2022 < $max_rank_change
+ORDER BY gni_per_capita DESC""",
+    "HDI of a country over the years": """\
+SELECT year, hdi, interpolated
+FROM trends_long
+WHERE country = $country
+ORDER BY year""",
+    "Average HDI by year": """\
+SELECT year, avg(hdi) AS mean_hdi, count(hdi) AS countries
+FROM trends_long
+GROUP BY year
+ORDER BY year""",
+}
+DEFAULT_PARAMETERS = {
+    "min_gni": "20000",
+    "max_rank_change": "0",
+    "country": "Norway",
+}
+
+
+def parse_parameter(value: str) -> float | str:
+    """read a parameter input as a number if possible, otherwise as text.
+
+    Args:
+        value (str): the text of the input
+
+    Returns:
+        float | str: the parameter value
+    """
+    try:
+        return float(value)
+    except ValueError:
+        return value
+
+
+@st.fragment
+def query_section(con) -> None:
+    """Render the query editor, its parameters and the result.
+
+    Args:
+        con (duckdb.DuckDBPyConnection): the connection over the data
+    """
+    example = st.selectbox("Start from an example:", options=list(EXAMPLES))
+    sql = st.text_area(
+        "SQL query:", value=EXAMPLES[example], height=220, key=f"sql_{example}"
+    )
+
+    # one input per $name placeholder
+    params = {}
+    names = query_parameters(sql)
+    for col, name in zip(st.columns(max(len(names), 1)), names):
+        params[name] = parse_parameter(
+            col.text_input(
+                f"${name}",
+                value=DEFAULT_PARAMETERS.get(name, ""),
+                key=f"param_{name}",
+            )
+        )
+
+    try:
+        start = time.perf_counter()
+        result = run_query(con, sql, params)
+        elapsed = time.perf_counter() - start
+    except Exception as error:
+        # syntax errors, unknown columns, missing parameters etc.
+        st.error(str(error))
+        return
+
+    st.caption(f"{len(result)} rows in {elapsed * 1000:.1f} ms")
+    st.dataframe(result, hide_index=True)
+    download_data(result, "query_result")
+
+    numeric_columns = result.select_dtypes(include="number").columns
+    if len(result) and len(numeric_columns) and st.checkbox("Plot result"):
+        x = st.selectbox("X axis:", options=result.columns)
+        y = st.selectbox(
+            "Y axis:", options=numeric_columns, index=len(numeric_columns) - 1
+        )
+        kind = st.radio(
+            "Chart:", options=["scatter", "line", "bar"], horizontal=True
+        )
+        chart = {"scatter": px.scatter, "line": px.line, "bar": px.bar}[kind]
+        plotly_chart(chart(result, x=x, y=y), use_container_width=True)
+
+
+# main workflow
+if __name__ == "__main__":
+    st.title("Query the HDR data")
+    sync_session_data()
+    if "data" not in st.session_state:
+        st.warning(
+            "No data loaded! Please upload an excel file on the EDA page!"
+        )
+        st.stop()
+
+    sheets = st.session_state["data"]
+    fingerprint = st.session_state["data_fingerprint"]
+    try:
+        con = connect(fingerprint, sheets)
+    except ImportError:
+        st.error("The query page needs duckdb: pip install duckdb")
+        st.stop()
+
+    st.markdown(
+        "Write a SQL query over the sheets of the workbook. Every sheet is a "
+        "table named in snake_case (e.g. `hdi`, `hdi_trends`), and "
+        "`trends_long` holds the annual HDI of every country. Use "
+        "`$name` for parameters."
+    )
+    with st.expander("Tables and columns"):
+        st.dataframe(schema(con), hide_index=True)
+
+    query_section(con)
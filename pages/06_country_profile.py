@@ -0,0 +1,129 @@
+import pandas as pd
+import streamlit as st
+
+from hdr import datasets
+from hdr.charts import plotly_chart
+from hdr.config import pop_gnipc_path
+from hdr.lazy import lazy_import
+from hdr.loaders import submit_workbook, sync_session_data
+from hdr.profiles import (
+    CountryProfile,
+    cached_country_index,
+    get_country_profile,
+)
+from hdr.schema import HDI_SCHEMA, SchemaDriftError, compile_mapping
+
+# plotly is only imported once the first chart is drawn
+px = lazy_import("plotly.express")
+
+st.set_page_config(page_title="Country profile", page_icon="🔍", layout="wide")
+
+# headline indicators of the HDI sheet, shown as metrics
+HEADLINE = {
+    "HDI": "HDI",
+    "HDI_rank": "HDI rank",
+    "Life expectancy at birth": "Life expectancy",
+    "Expected years of schooling": "Expected schooling",
+    "Mean years of schooling": "Mean schooling",
+    "Gross national income (GNI) per capita": "GNI per capita",
+}
+
+
+def headline_metrics(profile: CountryProfile) -> None:
+    """Show the headline indicators of a country as metrics.
+
+    Args:
+        profile (CountryProfile): the profile of the country
+    """
+    row = profile.rows.get("HDI")
+    if row is None:
+        return
+    try:
+        # the raw row is labelled by the sheet's header; use the mapped names
+        row = row.rename(compile_mapping(HDI_SCHEMA, row.index).rename)
+    except SchemaDriftError:
+        return
+    available = [col for col in HEADLINE if col in row.index]
+    for col, column in zip(st.columns(len(available)), available):
+        value = pd.to_numeric(row[column], errors="coerce")
+        if pd.isna(value):
+            value = row[column]
+        elif abs(value) >= 1000:
+            value = f"{value:,.0f}"
+        else:
+            value = f"{value:.3g}"
+        col.metric(HEADLINE[column], value)
+
+
+def hdi_trend_plot(profile: CountryProfile) -> None:
+    """Plot the annual HDI of a country, interpolated years dotted.
+
+    Args:
+        profile (CountryProfile): the profile of the country
+    """
+    if profile.drift is not None:
+        # the annex tables are still shown, without the trend
+        st.warning(profile.drift.replace("\n", "\n\n"))
+    if profile.trend is None:
+        return
+    st.header("HDI over the years")
+    fig = px.line(
+        profile.trend,
+        x="year",
+        y="hdi",
+        markers=True,
+        hover_data=["rank", "interpolated"],
+    )
+    observed = profile.trend[~profile.trend["interpolated"]]
+    fig.add_scatter(
+        x=observed["year"],
+        y=observed["hdi"],
+        mode="markers",
+        name="reported",
+        marker={"size": 9},
+    )
+    plotly_chart(fig, use_container_width=True)
+
+
+def all_tables(profile: CountryProfile) -> None:
+    """Show the row of the country in every table.
+
+    Args:
+        profile (CountryProfile): the profile of the country
+    """
+    st.header("All tables")
+    for table, row in profile.rows.items():
+        with st.expander(table, expanded=table == "HDI"):
+            # drop the empty spacer columns of the annex layout
+            row = row[~row.index.astype(str).str.startswith("Unnamed")]
+            st.dataframe(row.rename("value").astype(str), width="stretch")
+
+
+# main workflow
+if __name__ == "__main__":
+    st.title("Country profile")
+    sync_session_data()
+    if "data" not in st.session_state:
+        st.warning(
+            "No data loaded! Please upload an excel file on the EDA page!"
+        )
+        st.stop()
+
+    pop_gnipc_fingerprint, pop_gnipc_future = submit_workbook(
+        pop_gnipc_path(), "Sheet1"
+    )
+    sources = {
+        **datasets.annex_sources(
+            st.session_state["data_fingerprint"], st.session_state["data"]
+        ),
+        "pop_gnipc": (pop_gnipc_fingerprint, pop_gnipc_future.result()),
+    }
+
+    countries = cached_country_index(sources).countries()
+    country = st.selectbox("Select a country:", options=countries)
+    profile = get_country_profile(country, sources)
+
+    st.subheader(profile.country)
+    headline_metrics(profile)
+    hdi_trend_plot(profile)
+    all_tables(profile)
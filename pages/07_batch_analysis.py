@@ -0,0 +1,123 @@
+import os
+import time
+
+import pandas as pd
+import streamlit as st
+
+from hdr.config import annex_path, get_setting
+from hdr.fingerprints import fingerprint_file
+from hdr.jobs import (
+    CANCELLED,
+    DONE,
+    FAILED,
+    QUEUED,
+    Job,
+    JobQueueFull,
+    get_runner,
+)
+
+st.set_page_config(page_title="Batch analysis", page_icon="⚙️", layout="wide")
+
+# seconds between two refreshes of the progress of a running job
+REFRESH_SECONDS = 1.0
+
+
+def job_progress(job: Job) -> None:
+    """Show the stage, figure count and elapsed time of a job.
+
+    Args:
+        job (Job): the job
+    """
+    elapsed = (job.finished or time.time()) - (job.started or time.time())
+    stage = job.stage or job.state
+    st.progress(
+        job.fraction,
+        text=f"{stage}: {job.figures} figures saved, {elapsed:.0f} s",
+    )
+
+
+def running_job(job: Job) -> None:
+    """Poll a queued or running job until it ends.
+
+    Only this fragment reruns while the job is active, so the rest of the
+    page and the other pages stay responsive.
+
+    Args:
+        job (Job): the job
+    """
+    if not job.active:
+        # draw the final state once, with the polling fragment gone
+        st.rerun(scope="app")
+    if job.state == QUEUED:
+        st.info("Waiting for the running analysis to finish.")
+    job_progress(job)
+    if st.button("Cancel", key=f"cancel_{job.id}"):
+        get_runner().cancel(job)
+        st.rerun(scope="app")
+
+
+def finished_job(job: Job) -> None:
+    """Show how a job ended.
+
+    Args:
+        job (Job): the job
+    """
+    if job.state == DONE:
+        st.success(
+            f"The analysis saved {job.figures} figures in "
+            f"{get_setting('root_dir_output')}."
+        )
+    elif job.state == FAILED:
+        st.error("The analysis failed:")
+        st.code(job.error or "", language="text")
+    elif job.state == CANCELLED:
+        st.warning("The analysis was cancelled.")
+    job_progress(job)
+
+
+# main workflow
+if __name__ == "__main__":
+    st.title("Batch analysis")
+    st.markdown(
+        "Run `analyze_hdr.py` on the default workbook in a background "
+        "process. It writes the figures to `figures/hdi` and the text "
+        "report to `txt/hdi` under `root_dir_output`."
+    )
+
+    path = annex_path()
+    if not os.path.exists(path):
+        st.warning(f"The workbook {path} does not exist. Check `data_path`.")
+        st.stop()
+
+    runner = get_runner()
+    # one job per workbook content: a second click, or another user,
+    # gets the job that is already queued or running
+    fingerprint = fingerprint_file(path)
+    job = runner.job(fingerprint)
+    if st.button("Run the analysis", disabled=job is not None and job.active):
+        try:
+            job = runner.submit(path)
+        except JobQueueFull as error:
+            st.error(f"{error}. Try again later.")
+
+    if job is not None:
+        if job.active:
+            st.fragment(running_job, run_every=REFRESH_SECONDS)(job)
+        else:
+            finished_job(job)
+
+    jobs = runner.jobs()
+    if jobs:
+        st.subheader("Jobs")
+        st.dataframe(
+            pd.DataFrame(
+                {
+                    "job": [j.id for j in jobs],
+                    "workbook": [j.fingerprint for j in jobs],
+                    "state": [j.state for j in jobs],
+                    "stage": [j.stage for j in jobs],
+                    "figures": [j.figures for j in jobs],
+                }
+            ),
+            hide_index=True,
+        )